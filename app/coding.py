@@ -1,15 +1,15 @@
 import streamlit as st
-import traceback
-from io import StringIO
-import sys
 import time
 import json
 import os
 
-from core.error_handler import explain_error, log_user_error, get_reinforcement_message
+from core.error_handler import resolve_error, log_user_error, get_reinforcement_message
+from core.error_record import describe_error, format_error
 from core.progress import log_progress
 from core.code_analyzer import analyze_code_style
-from core.api_helper import explain_with_gemini
+from core.api_helper import explain_with_gemini, stream_with_gemini
+from core.sandbox import run_code
+from core.prompt_builder import build_simplify_error_prompt
 from app.concepts import ERROR_TO_CONCEPT 
 
 ERROR_EXPLANATIONS = {
@@ -29,39 +29,64 @@ def increment_error_count(category):
     st.session_state["error_counts"][category_lower] = st.session_state["error_counts"].get(category_lower, 0) + 1
 
 
+# Show streamed Gemini output in `placeholder` as it arrives; returns the full text.
+def stream_into(placeholder, prompt):
+    text = ""
+    for chunk in stream_with_gemini(prompt):
+        text += chunk
+        placeholder.info(text + " ▌")
+    placeholder.empty()
+    return text.strip()
+
+
+# Swap in Gemini's explanation once the speculative call started by
+# resolve_error finishes; until then show that it's still on its way.
+def show_pending_explanation():
+    future = st.session_state.get('pending_explanation')
+    if future is None:
+        return
+    if not future.done():
+        st.caption("⏳ Gemini is still working on a more detailed explanation...")
+        return
+    st.session_state.pop('pending_explanation', None)
+    remote = future.result()
+    # A failed call only replaces the "still looking" placeholder
+    if remote["tier"] == "gemini" or st.session_state.get('explanation_tier') == "pending":
+        st.session_state['explanation'] = remote["explanation"]
+        st.session_state['fix_hint'] = remote["hint"]
+    st.rerun(scope="app")
+
+
 # Fetch API.
-def simplify_error_with_api(user_code, error_message):
+# With a placeholder the answer is streamed into it token by token.
+def simplify_error_with_api(user_code, error_message, placeholder=None):
     if 'ai_explanations' not in st.session_state:
         st.session_state['ai_explanations'] = []
-    previous_explanations = "\n---\n".join(st.session_state['ai_explanations'])
-    prompt = ""
-
-    if previous_explanations:
-        prompt = (
-            f"A beginner is still confused about an error in their Python code. "
-            f"Here is their code:\n\n```python\n{user_code}\n```\n\n"
-            f"The error is:\n`{error_message}`\n\n"
-            f"You already provided these explanations:\n{previous_explanations}\n\n"
-            f"Please provide another explanation, but use a completely different analogy or a simpler perspective. Be very encouraging."
-        )
-    else:
-        prompt = (
-            f"Explain this Python error in very simple, beginner-friendly terms. "
-            f"The error is:\n`{error_message}`\n\n"
-            f"The user wrote this code:\n\n```python\n{user_code}\n```\n\n"
-            f"Tell them what's wrong and how to fix it in their specific code."
-        )
+    # Prior answers are shortened to fit a fixed budget so retries don't keep growing
+    prompt, stats = build_simplify_error_prompt(user_code, error_message, st.session_state['ai_explanations'])
+    st.session_state.setdefault('ai_prompt_sizes', []).append(stats["tokens"])
+    print(
+        f"📏 Simplify prompt: ~{stats['tokens']} tokens ({stats['chars']} chars), "
+        f"{stats['previous_used']}/{stats['previous_total']} earlier explanations included."
+    )
 
     try:
-        response = explain_with_gemini(prompt)
+        if placeholder is not None:
+            response = stream_into(placeholder, prompt)
+        else:
+            response = explain_with_gemini(prompt)
         st.session_state['ai_explanations'].append(response)
     except Exception as e:
         st.session_state['ai_explanations'].append(f"⚠️ API Error: {e}")
 
 
-def simplify_concept_with_api(concept_key):
+def simplify_concept_with_api(concept_key, placeholder=None):
+    prompt = f"Explain the Python concept '{concept_key}' in a simple way with a short example."
     try:
-        response = explain_with_gemini(f"Explain the Python concept '{concept_key}' in a simple way with a short example.")
+        if placeholder is not None:
+            response = stream_into(placeholder, prompt)
+        else:
+            response = explain_with_gemini(prompt)
         st.session_state["ai_concept_explanation"] = response
     except Exception as e:
         st.session_state["ai_concept_explanation"] = f"⚠️ API Error: {e}"
@@ -84,33 +109,39 @@ def coding_practice(username):
     if st.button("▶️ Run Code"):
         # Clear previous run results
         st.session_state.pop("error_message", None)
+        st.session_state.pop("error_record", None)
         st.session_state.pop("ai_explanations", None)
         st.session_state.pop("execution_output", None)
         st.session_state.pop("probable_category", None)
         st.session_state.pop("fix_hint", None)
         st.session_state.pop("example", None)
+        st.session_state.pop("pending_explanation", None)
 
         start_time = time.time()
-        old_stdout = sys.stdout
-        sys.stdout = mystdout = StringIO()
         predicted_category_from_ai = None
 
-        try:
-            local_vars = {}
-            exec(st.session_state['user_code'], {}, local_vars)
-            st.session_state['execution_output'] = mystdout.getvalue()
+        # Runs in a pooled worker process, never in this server thread
+        result = run_code(st.session_state['user_code'])
+        if result["ok"]:
+            st.session_state['execution_output'] = result["stdout"]
             passed, total = 1, 1
             log_user_error(username, "SuccessfulExecution")
-
-        except Exception as e:
-            error_message = str(e)
-            st.session_state['error_message'] = error_message
-            explanation, fix_hint, example, predicted_category_from_ai = explain_error(error_message, username)
+        else:
+            # Exception type, message and failing line, built in the worker
+            error_record = result["error_record"]
+            st.session_state['error_record'] = error_record
+            st.session_state['error_message'] = format_error(error_record)
+            # Best answer within the latency budget; Gemini may still be working
+            resolved = resolve_error(error_record, username)
+            predicted_category_from_ai = resolved["category"]
             # Store results in session state for display logic below
-            st.session_state['explanation'] = explanation
-            st.session_state['fix_hint'] = fix_hint
-            st.session_state['example'] = example
+            st.session_state['explanation'] = resolved["explanation"]
+            st.session_state['fix_hint'] = resolved["hint"]
+            st.session_state['example'] = resolved["example"]
             st.session_state['probable_category'] = predicted_category_from_ai
+            st.session_state['explanation_tier'] = resolved["tier"]
+            if resolved["pending"] is not None:
+                st.session_state['pending_explanation'] = resolved["pending"]
 
             # Increment count and log 
             if predicted_category_from_ai:
@@ -119,10 +150,8 @@ def coding_practice(username):
             else:
                 log_user_error(username, "UnknownError")
 
-        finally:
-            sys.stdout = old_stdout
-            duration = int(time.time() - start_time)
-            log_progress(username, "free_practice", passed, total, st.session_state['user_code'], duration)
+        duration = int(time.time() - start_time)
+        log_progress(username, "free_practice", passed, total, st.session_state['user_code'], duration)
 
 # Display Logic 
 
@@ -158,14 +187,22 @@ def coding_practice(username):
         if example:
             st.code(example, language="python")
 
+        if st.session_state.get('pending_explanation') is not None:
+            # Polls without rerunning the whole page until Gemini answers
+            st.fragment(run_every=1.0)(show_pending_explanation)()
+
         # Simplify Button Logic.
         if st.button("🤖 Simplify This Error"):
-            with st.spinner("Simplifying error explanation using Gemini..."):
-                simplify_error_with_api(st.session_state['user_code'], st.session_state['error_message'])
+            # Tokens appear here as they arrive, then move to the list below
+            error_record = st.session_state.get('error_record')
+            error_text = describe_error(error_record) if error_record else st.session_state['error_message']
+            simplify_error_with_api(st.session_state['user_code'], error_text, placeholder=st.empty())
 
         if st.session_state.get('ai_explanations'):
             st.write("---")
             st.subheader("🤖 AI Assistant's Additional Explanations:")
+            if st.session_state.get('ai_prompt_sizes'):
+                st.caption(f"Last prompt size: ~{st.session_state['ai_prompt_sizes'][-1]} tokens")
             for exp in reversed(st.session_state['ai_explanations']):
                 st.info(exp)
                 st.markdown("---")
@@ -1,38 +1,126 @@
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from core.progress import load_progress
+from core.learning_log import get_error_counts
+from core.progress import get_progress_revision, load_difficulty_rollups, load_progress, load_task_rollups
+from core.timeseries import DEFAULT_POINT_BUDGET, bucket_series, downsample_traces, limit_traces
 import os
-import json
+
+# Only the fields the charts and table use; stored code is never loaded here
+RECENT_COLUMNS = ["timestamp", "task_id", "passed", "total", "duration_seconds", "difficulty"]
+RECENT_ATTEMPTS = 10
+TIME_CHART_COLUMNS = ["task_id", "timestamp", "duration_seconds", "difficulty"]
+
+# The time chart is bucketed and downsampled on the server so the figure sent
+# to the browser holds at most CHART_POINT_BUDGET points however long the
+# history is; past DEFAULT_MAX_TRACES tasks the quieter ones share an
+# "Other" line. Each view is (title, bucket frequency or None, trace column).
+CHART_POINT_BUDGET = int(os.getenv("DASHBOARD_CHART_POINTS", str(DEFAULT_POINT_BUDGET)))
+TIME_VIEWS = {
+    "Per attempt": ("Time Spent per Attempt", None, "task_id"),
+    "Daily": ("Average Time per Day", "D", "task_id"),
+    "Weekly": ("Average Time per Week", "W", "task_id"),
+    "By difficulty": ("Average Time per Week by Difficulty", "W", "difficulty"),
+}
 
 # Loads user progress
 def load_user_progress(username):
-    if not os.path.exists("data/user_learning_log.json"):
+    counts = get_error_counts(username)
+    if not counts:
         return pd.DataFrame()
-    with open("data/user_learning_log.json", "r", encoding="utf-8") as f:
-        data = json.load(f)
-    user_data = data.get(username, {})
-    if not user_data:
-        return pd.DataFrame()
-    return pd.DataFrame(list(user_data.items()), columns=["Error Type", "Count"])
+    return pd.DataFrame(list(counts.items()), columns=["Error Type", "Count"])
+
+
+# Timestamps written by log_progress carry a +05:30 offset; older records are
+# naive and were written in the same local time.
+LOCAL_TZ = "Asia/Kolkata"
+
+
+def _parse_timestamps(values):
+    values = values.astype(str)
+    naive = ~values.str.contains(r"(?:[+-]\d{2}:\d{2}|Z)$", regex=True)
+    values = values.where(~naive, values + "+05:30")
+    return pd.to_datetime(values, utc=True, format="ISO8601").dt.tz_convert(LOCAL_TZ)
+
+
+# Everything the progress section shows, built once per (user, revision).
+# The revision changes whenever the user logs an attempt, so a new attempt
+# invalidates the cached entry and reruns in between are served from cache.
+@st.cache_data(show_spinner=False, max_entries=512)
+def build_progress_view(username, revision):
+    # Only the rows the "Recent Attempts" table shows; the charts use rollups
+    data = load_progress(username, columns=RECENT_COLUMNS, limit=RECENT_ATTEMPTS)
+    if not data:
+        return None
+
+    recent = pd.DataFrame(data)
+    recent["timestamp"] = _parse_timestamps(recent["timestamp"])
+
+    # Per-task and per-difficulty numbers come from the incrementally
+    # maintained rollups instead of regrouping every attempt
+    tasks = pd.DataFrame(load_task_rollups(username))
+    difficulties = pd.DataFrame(load_difficulty_rollups(username))
+    overall_rate = float((difficulties["success_rate"] * difficulties["attempts"]).sum() / difficulties["attempts"].sum())
+    if not np.isfinite(overall_rate):
+        overall_rate = 0.0
+
+    fig1 = px.bar(
+        tasks,
+        x="task_id",
+        y="success_rate",
+        color="difficulty",
+        hover_data=["attempts"],
+        title="Average Success per Task",
+    )
+    fig3 = px.pie(difficulties, names="difficulty", values="attempts", title="Difficulty Distribution")
+
+    return {"overall_rate": overall_rate, "figures": (fig1, fig3), "recent": recent}
+
+
+# The "Time Spent on Tasks" figure for one of TIME_VIEWS, cached like the
+# rest of the view on (user, revision) plus the chosen view and budget.
+@st.cache_data(show_spinner=False, max_entries=512)
+def build_time_chart(username, revision, view, point_budget=CHART_POINT_BUDGET):
+    data = load_progress(username, columns=TIME_CHART_COLUMNS)
+    if not data:
+        return None
+
+    title, freq, trace = TIME_VIEWS[view]
+    df = pd.DataFrame(data)
+    df["timestamp"] = _parse_timestamps(df["timestamp"])
+    df["duration_seconds"] = pd.to_numeric(df["duration_seconds"], errors="coerce")
+    df = df.dropna(subset=["duration_seconds"])
+    df[trace] = df[trace].fillna("Unknown").astype(str)
+    df = limit_traces(df, trace)
+
+    if freq is not None:
+        df = bucket_series(df, "timestamp", "duration_seconds", trace, freq)
+    df = downsample_traces(df, "timestamp", "duration_seconds", trace, point_budget)
+
+    fig = px.line(
+        df,
+        x="timestamp",
+        y="duration_seconds",
+        color=trace,
+        hover_data=["attempts"] if freq is not None else None,
+        markers=freq is not None,
+        title=title,
+    )
+    return fig
 
 
 def dashboard(username):
     st.header("Your Progress Dashboard")
     # Overall coding progress 
-    data = load_progress(username)
-    if not data:
+    revision = get_progress_revision(username)
+    view = build_progress_view(username, revision)
+    if view is None:
         st.info("No progress yet. Try solving some exercises first!")
     else:
-        df = pd.DataFrame(data)
-        df["success_rate"] = df.apply(
-            lambda row: (row["passed"] / row["total"]) * 100 if row["total"] > 0 else 0,
-            axis=1,
-        )
-        overall_rate = df["success_rate"].mean()
-        if pd.isna(overall_rate) or overall_rate == float("inf"):
-            overall_rate = 0
+        fig1, fig3 = view["figures"]
+        overall_rate = view["overall_rate"]
 
         st.subheader("Overall Success Rate")
         st.progress(int(overall_rate))
@@ -40,39 +128,24 @@ def dashboard(username):
 
         # Performance by Task 
         st.subheader("Performance by Task")
-        fig1 = px.bar(
-            df,
-            x="task_id",
-            y="success_rate",
-            color="difficulty",
-            title="Average Success per Task",
-        )
         st.plotly_chart(fig1, use_container_width=True)
 
         # Time Spent Trend 
         st.subheader("Time Spent on Tasks")
-        df["timestamp"] = pd.to_datetime(df["timestamp"])
-        fig2 = px.line(
-            df,
-            x="timestamp",
-            y="duration_seconds",
-            color="task_id",
-            title="Time Spent per Attempt",
-        )
-        st.plotly_chart(fig2, use_container_width=True)
+        time_view = st.radio("Show", list(TIME_VIEWS), horizontal=True, key="time_chart_view")
+        fig2 = build_time_chart(username, revision, time_view)
+        if fig2 is not None:
+            st.plotly_chart(fig2, use_container_width=True)
 
         # Difficulty Distribution 
         st.subheader("Solved Tasks by Difficulty")
-        fig3 = px.pie(df, names="difficulty", title="Difficulty Distribution")
         st.plotly_chart(fig3, use_container_width=True)
 
         # Recent Attempts Table 
         st.subheader("Recent Attempts")
-        st.dataframe(
-            df[["timestamp", "task_id", "passed", "total", "duration_seconds", "difficulty"]].tail(10)
-        )
+        st.dataframe(view["recent"])
 
-    # Error Trends from user_learning_log.json 
+    # Error Trends from the learning log 
     df_error = load_user_progress(username)
     if not df_error.empty:
         st.subheader("Error Trends (Learning Insights)")
@@ -1,65 +1,37 @@
 import streamlit as st
-import json
-import sys
-import builtins
-import traceback
-from io import StringIO
+from contextlib import closing
 from core.code_analyzer import analyze_code_style # Add this line
-from core.error_handler import explain_error, log_user_error
-import os
+from core.error_handler import resolve_error, log_user_error
+from core.error_record import format_error
 import time
 from core.progress import log_progress
+from core.tasks import TASKS_DB, load_catalogue
+from core.grader import iter_grade
 # from st_ace import st_ace
 
-TASKS_DB = "data/coding_task.json"
-
 #Load tasks safely, return list (empty list if file missing/invalid).
+# The catalogue is parsed once per process and shared with get_difficulty().
 def load_tasks():
-    if not os.path.exists(TASKS_DB):
-        return []
-    try:
-        with open(TASKS_DB, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            data = json.loads(content)
-            if isinstance(data, list):
-                return data
-            # if someone saved as dict, attempt to convert to list
-            if isinstance(data, dict):
-                return list(data.values())
-            return []
-    except json.JSONDecodeError as e:
-        st.error(f"Failed to load tasks JSON: {e}")
-        return []
-
-# collapse whitespace, strip.
-def normalize_text(s):
-    if s is None:
-        return ""
-    if not isinstance(s, str):
-        s = str(s)
-    return " ".join(s.strip().split())
-
-def compare_outputs(user_out, expected_out):
-    return normalize_text(user_out) == normalize_text(expected_out)
-
-def make_input_fn(input_str):
-    if input_str is None:
-        parts = []
-    elif "\n" in input_str:
-        parts = [p for p in input_str.splitlines()]
-    else:
-        parts = [p for p in input_str.split()] if input_str.strip() else []
-    it = iter(parts)
-
-    def _input(prompt=""):
-        try:
-            return next(it)
-        except StopIteration:
-            # If code tries to read more input than provided, raise EOFError similar to real input
-            raise EOFError("No more input provided for this test case.")
-    return _input
+    catalogue = load_catalogue(TASKS_DB)
+    if catalogue["error"]:
+        st.error(catalogue["error"])
+    return catalogue["tasks"]
+
+
+# Explanation for a failed test case. When Gemini was still working at the
+# latency budget, this shows the local answer and swaps in Gemini's once the
+# call finishes.
+def show_explanation(resolved):
+    explanation, hint, future = resolved["explanation"], resolved["hint"], resolved["pending"]
+    if future is not None and future.done():
+        remote = future.result()
+        # A failed call only replaces the "still looking" placeholder
+        if remote["tier"] == "gemini" or resolved["tier"] == "pending":
+            explanation, hint = remote["explanation"], remote["hint"]
+    st.info(f"📘 Explanation: {explanation}")
+    st.warning(f"💡 Hint: {hint}")
+    if future is not None and not future.done():
+        st.caption("⏳ Gemini is still working on a more detailed explanation...")
 
 def exercises(username):
     start_time = time.time()
@@ -116,78 +88,66 @@ def exercises(username):
         total = len(test_cases) if test_cases else 0
         passed = 0 # Reset passed count for this run
 
-        for i, case in enumerate(test_cases, start=1):
-            st.markdown(f"---\n**Running test case #{i}**")
-            user_input = case.get("input", "")
-            expected = case.get("expected_output", "")
-
-            old_stdout = sys.stdout
-            old_input = builtins.input
-            sys.stdout = mystdout = StringIO()
-            builtins.input = make_input_fn(user_input)
-
-            # Execute user code
-            try:
-                local_vars = {}
-                exec(code, {}, local_vars)
-                output = mystdout.getvalue()
-                if output is None:
-                    output = ""
-                output = output.rstrip("\n") 
-                st.write("🔹 Output:")
-                st.code(output or "<no output>", language="text")
-
-                # compare
-                if expected != "": # Only compare if expected output is defined
-                    ok = compare_outputs(output, expected)
-                else:
-                    # If no expected output, consider it passed if no error occurred
-                    ok = True # Assume pass if code runs without error and no output expected
-
-                if ok:
-                    st.success(f"✅ Test case #{i} passed")
-                    passed += 1
-
-                    if passed == total:
-                        st.markdown("---") # separator
-                        ai_feedback = analyze_code_style(code)
-                        if ai_feedback:
-                            st.markdown("### 💡 Code Improvement Suggestions")
-                            st.write(ai_feedback)
-                else:
-                    st.error(f"❌ Test case #{i} failed")
-                    if expected != "": # Show expected only if it was defined
-                        st.write("Expected:")
-                        st.code(expected, language="text")
-
-            except Exception as e:
-                # show full traceback to help debugging
-                tb = traceback.format_exc()
-                st.error(f"⚠️ Runtime error on test case #{i}: {e}")
-                st.code(tb, language="text")        
-                explanation, fix_hint, example, predicted_category = explain_error(str(e), username)
+        # Cases run concurrently in the sandbox pool; each is shown as it finishes.
+        # Every case is counted, so the score doesn't depend on arrival order.
+        first_error = None
+        with closing(iter_grade(code, test_cases, fail_fast=False)) as results:
+            for result in results:
+                i = result["index"]
+                expected = result["expected"]
+                st.markdown(f"---\n**Test case #{i}**")
+
+                if result["ok"]:
+                    output = result["output"]
+                    st.write("🔹 Output:")
+                    st.code(output or "<no output>", language="text")
+
+                    if result["passed"]:
+                        st.success(f"✅ Test case #{i} passed")
+                        passed += 1
+                    else:
+                        st.error(f"❌ Test case #{i} failed")
+                        if expected != "": # Show expected only if it was defined
+                            st.write("Expected:")
+                            st.code(expected, language="text")
 
+                else:
+                    # show full traceback to help debugging
+                    st.error(f"⚠️ Runtime error on test case #{i}: {format_error(result['error_record'])}")
+                    if result["traceback"]:
+                        st.code(result["traceback"], language="text")
+                    if first_error is None or i < first_error["index"]:
+                        first_error = result
+
+        # Explain only the earliest failing case, as the old serial run did
+        if first_error is not None:
+            st.markdown(f"---\n**About the error in test case #{first_error['index']}**")
+            resolved = resolve_error(first_error["error_record"], username)
+            explanation, predicted_category = resolved["explanation"], resolved["category"]
+
+            if predicted_category:
+                log_user_error(username, predicted_category)
+            else:
+                # Log generically if resolve_error couldn't categorize
+                log_user_error(username, "UnknownExerciseError")
+
+            if explanation:
                 if predicted_category:
-                    log_user_error(username, predicted_category)
+                   st.info(f"🤖 AI thinks this might be a **{predicted_category}**.")
+                if resolved["pending"] is None:
+                    show_explanation(resolved)
                 else:
-                    # Log generically if explain_error couldn't categorize
-                    log_user_error(username, "UnknownExerciseError")
-
-                if explanation:
-                    if predicted_category:
-                       st.info(f"🤖 AI thinks this might be a **{predicted_category}**.")
-                    st.info(f"📘 Explanation: {explanation}") 
-                    st.warning(f"💡 Hint: {fix_hint}")
-                    if example:
-                        st.code(example, language="python")
-
-                # don't continue other test cases if runtime error occurs for safety
-                break # Stop processing further test cases on error
-
-            finally:
-                # restore stdout and input
-                sys.stdout = old_stdout
-                builtins.input = old_input
+                    # Polls on its own so the summary and progress below aren't held up
+                    st.fragment(run_every=1.0)(show_explanation)(resolved)
+                if resolved["example"]:
+                    st.code(resolved["example"], language="python")
+
+        if total > 0 and passed == total:
+            st.markdown("---") # separator
+            ai_feedback = analyze_code_style(code)
+            if ai_feedback:
+                st.markdown("### 💡 Code Improvement Suggestions")
+                st.write(ai_feedback)
 
         # End timing after all test cases for this run
         end_time = time.time()
@@ -1,27 +1,5 @@
 import streamlit as st
-import json
-import os
-
-# Path to the user database
-USER_DB = "db/users.json"
-
-# Loads users from JSON file, return empty dict if file is empty/invalid.
-def load_users():
-    if os.path.exists(USER_DB):
-        try:
-            with open(USER_DB, "r") as f:
-                content = f.read().strip()
-                if not content:  # if file is empty
-                    return {}
-                return json.loads(content)
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def save_users(users):
-    """Save users dictionary into JSON file."""
-    with open(USER_DB, "w") as f:
-        json.dump(users, f, indent=4)
+from core.users import create_user, verify_user
 
 # Sign Up function
 def signup():
@@ -30,14 +8,11 @@ def signup():
     new_pass = st.text_input("Choose a password", type="password")
 
     if st.button("Sign Up"):
-        users = load_users()
-        if new_user in users:
-            st.warning("⚠️ Username already exists. Try another one.")
-        elif not new_user or not new_pass:
+        if not new_user or not new_pass:
             st.error("Username and password cannot be empty.")
+        elif not create_user(new_user, new_pass):
+            st.warning("⚠️ Username already exists. Try another one.")
         else:
-            users[new_user] = {"password": new_pass}
-            save_users(users)
             st.success("✅ Account created successfully! Please log in now.")
 
 # Login function
@@ -47,8 +22,7 @@ def login():
     password = st.text_input("Password", type="password")
 
     if st.button("Login"):
-        users = load_users()
-        if username in users and users[username]["password"] == password:
+        if verify_user(username, password):
             st.success(f"🎉 Welcome {username}!")
             return True, username
         else:
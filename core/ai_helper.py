@@ -1,31 +1,64 @@
-import joblib
 import os
+from itertools import islice
 
-MODEL_PATH = "models/error_classifier.pkl"
-VECTORIZER_PATH = "models/vectorizer.pkl"
+from core.file_cache import load_cached
+from core.model_artifact import ARTIFACT_PATH, load_artifact, manifest_path, predict_proba
 
-def load_ai_model():
-    # Safely load the trained AI model and its vectorizer if available.
-    if not os.path.exists(MODEL_PATH) or not os.path.exists(VECTORIZER_PATH):
-        print("⚠️ AI model not found. Please run train_error_classifier.py to train it first.")
-        return None, None
+MODEL_PATH = ARTIFACT_PATH
+BATCH_SIZE = 1024
 
+
+def _read_model(path):
     try:
-        model = joblib.load(MODEL_PATH)
-        vectorizer = joblib.load(VECTORIZER_PATH)
-        return model, vectorizer
+        # Arrays are memory-mapped, so this only reads the manifest
+        artifact = load_artifact(os.path.dirname(path))
+        print("✅ Model artifact loaded successfully.")
+        return artifact
     except Exception as e:
-        print(f"⚠️ Failed to load AI model: {e}")
-        return None, None
+        print(f"⚠️ Model loading failed from {os.path.dirname(path)}: {e}")
+        return None # Return None on error
 
-def predict_error_category(error_message):
-    # Takes an error message and predicts its category and confidence.
-    model, vectorizer = load_ai_model()
-    if model is None or vectorizer is None:
-        return {"category": None, "confidence": 0.0}
 
-    X = vectorizer.transform([error_message])
-    prediction = model.predict(X)[0]
-    confidence = max(model.predict_proba(X)[0])
-    return {"category": prediction, "confidence": confidence}
+# The artifact is loaded once per process and shared by every session; it is
+# only read again when it changes on disk (e.g. after retraining).
+def load_model():
+    path = manifest_path(MODEL_PATH)
+    if not os.path.exists(path):
+        print(f"⚠️ AI model not found at {MODEL_PATH}. Please run train_error_classifier.py to train it first.")
+        return None # Return None if file doesn't exist
+
+    return load_cached(path, _read_model)
+
+
+# Class probabilities for a batch of texts, vectorized in one pass.
+def _class_probabilities(model, texts):
+    return model["manifest"]["labels"], predict_proba(model, texts)
+
 
+# Classify many error messages, yielding {"category", "confidence"} per message
+# in input order. Accepts any iterable and works through it batch by batch.
+def iter_predict_error_categories(error_messages, batch_size=BATCH_SIZE):
+    model = load_model()
+    messages = iter(error_messages)
+    while True:
+        batch = [str(m) for m in islice(messages, batch_size)]
+        if not batch:
+            return
+        if model is None:
+            for _ in batch:
+                yield {"category": None, "confidence": 0.0}
+            continue
+
+        classes, probabilities = _class_probabilities(model, batch)
+        best = probabilities.argmax(axis=1)
+        for i, j in enumerate(best):
+            yield {"category": str(classes[j]), "confidence": float(probabilities[i, j])}
+
+
+def predict_error_categories(error_messages, batch_size=BATCH_SIZE):
+    return list(iter_predict_error_categories(error_messages, batch_size))
+
+
+def predict_error_category(error_message):
+    # Takes an error message and predicts its category and confidence.
+    return predict_error_categories([error_message])[0]
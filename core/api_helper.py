@@ -1,19 +1,94 @@
+import asyncio
+import json
 import os
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 from pathlib import Path
 
+from core.response_cache import cache_key, cached_call, get_cached, put_cached
+
 # Load API key from .env
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Overridable so a local stand-in server can be used for testing
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = "gemini-2.5-flash"
+CONNECT_TIMEOUT_SECONDS = 5
+REQUEST_TIMEOUT_SECONDS = 30
+# Ceiling on one call including every retry and backoff sleep
+TOTAL_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", "40"))
 
-def explain_with_gemini(prompt):
-    if not GEMINI_API_KEY:
-        return "⚠️ Gemini API key missing or not loaded. Check your .env file."
+# Retries for rate limits, server errors and failed connections, with
+# full-jitter exponential backoff. A read timeout is not retried: the server
+# got the request and is slow, and asking again would only wait again.
+MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "8"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+POOL_MAXSIZE = int(os.getenv("GEMINI_POOL_MAXSIZE", "10"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# One keep-alive session for the whole process, so repeated calls reuse open
+# TLS connections instead of handshaking every time.
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass  # HTTP-date form, fall back to our own schedule
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
 
-    model_name = "gemini-2.5-flash"
-    
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:generateContent"
+
+# POST through the pooled session, retrying 429/5xx responses and connection
+# failures (including connect timeouts) while the deadline allows. Returns the
+# last response, or raises the last network error.
+def _post_with_retry(url, max_retries=MAX_RETRIES, deadline=TOTAL_DEADLINE_SECONDS, **kwargs):
+    give_up_at = time.monotonic() + deadline
+    for attempt in range(max_retries + 1):
+        remaining = give_up_at - time.monotonic()
+        timeout = (min(CONNECT_TIMEOUT_SECONDS, remaining), min(REQUEST_TIMEOUT_SECONDS, remaining))
+        try:
+            response = get_session().post(url, timeout=timeout, **kwargs)
+        except requests.exceptions.ConnectionError:
+            delay = _backoff_delay(attempt)
+            if attempt == max_retries or time.monotonic() + delay >= give_up_at:
+                raise
+            time.sleep(delay)
+            continue
+
+        if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+            return response
+        delay = _backoff_delay(attempt, response.headers.get("Retry-After"))
+        if time.monotonic() + delay >= give_up_at:
+            return response
+        print(f"⚠️ Gemini returned {response.status_code}, retrying ({attempt + 1}/{max_retries})...")
+        # Hand the connection back to the pool; a streamed body would hold it
+        response.close()
+        time.sleep(delay)
+
+
+def _request_gemini(prompt, model_name):
+    url = f"{GEMINI_API_BASE}/models/{model_name}:generateContent"
 
     headers = {"Content-Type": "application/json"}
     params = {"key": GEMINI_API_KEY}
@@ -24,7 +99,7 @@ def explain_with_gemini(prompt):
 
     try:
         print(f"🔗 Sending request to Gemini model: {model_name}...")
-        response = requests.post(url, headers=headers, params=params, json=data, timeout=30)
+        response = _post_with_retry(url, headers=headers, params=params, json=data)
         
         if response.status_code == 200:
             data = response.json()
@@ -44,3 +119,95 @@ def explain_with_gemini(prompt):
     except Exception as e:
         return f"⚠️ An unexpected error occurred: {e}"
 
+
+# Identical prompts are answered from the response cache; only misses (and
+# never errors) go out to the API.
+def explain_with_gemini(prompt):
+    if not GEMINI_API_KEY:
+        return "⚠️ Gemini API key missing or not loaded. Check your .env file."
+
+    model_name = GEMINI_MODEL
+    return cached_call(
+        prompt,
+        lambda: _request_gemini(prompt, model_name),
+        namespace=model_name,
+        should_cache=lambda text: not text.startswith("⚠️"),
+    )
+
+
+def _chunk_text(event):
+    parts = event.get("candidates", [{}])[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+# Stream the answer as it is generated, yielding text chunks from the
+# streamGenerateContent server-sent-events endpoint. A cached answer is
+# yielded in one piece, and a completed stream is stored in the cache.
+# Errors are yielded as a single "⚠️ ..." chunk, like explain_with_gemini().
+def stream_with_gemini(prompt):
+    if not GEMINI_API_KEY:
+        yield "⚠️ Gemini API key missing or not loaded. Check your .env file."
+        return
+
+    model_name = GEMINI_MODEL
+    key = cache_key(prompt, model_name)
+    cached = get_cached(key)
+    if cached is not None:
+        yield cached
+        return
+
+    url = f"{GEMINI_API_BASE}/models/{model_name}:streamGenerateContent"
+    params = {"key": GEMINI_API_KEY, "alt": "sse"}
+    data = {"contents": [{"parts": [{"text": prompt}]}]}
+
+    chunks = []
+    try:
+        print(f"🔗 Streaming from Gemini model: {model_name}...")
+        response = _post_with_retry(
+            url, headers={"Content-Type": "application/json"}, params=params, json=data, stream=True,
+        )
+        with response:
+            if response.status_code != 200:
+                yield f"⚠️ Gemini API Error: {response.status_code}\n{response.text}"
+                return
+            # SSE is UTF-8 by definition, but with no charset in the header
+            # requests would decode it as ISO-8859-1
+            response.encoding = "utf-8"
+            # chunk_size=None hands over each network chunk as soon as it arrives
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                # SSE frames look like "data: {...json...}"; skip keep-alives
+                if not line or not line.startswith("data:"):
+                    continue
+                text = _chunk_text(json.loads(line[len("data:"):].strip()))
+                if text:
+                    chunks.append(text)
+                    yield text
+    except requests.exceptions.ReadTimeout:
+        yield "⚠️ Gemini API Error: The request timed out. The server is taking too long."
+        return
+    except Exception as e:
+        yield f"⚠️ An unexpected error occurred: {e}"
+        return
+
+    full_text = "".join(chunks).strip()
+    if full_text:
+        put_cached(key, full_text)
+    else:
+        yield "⚠️ Gemini returned an empty response."
+
+
+# asyncio variants, for issuing several prompts at once (e.g. an error
+# explanation and a concept summary). These are a thread-pool wrapper around
+# the blocking client, not an async HTTP client: each call occupies a worker
+# thread and shares the pooled session and the response cache.
+async def explain_with_gemini_async(prompt):
+    return await asyncio.to_thread(explain_with_gemini, prompt)
+
+
+async def explain_many_with_gemini_async(prompts):
+    return await asyncio.gather(*(explain_with_gemini_async(p) for p in prompts))
+
+
+# Blocking helper for Streamlit code: answers come back in prompt order.
+def explain_many_with_gemini(prompts):
+    return asyncio.run(explain_many_with_gemini_async(prompts))
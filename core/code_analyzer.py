@@ -1,37 +1,152 @@
-
 import ast
-import re
+from collections import defaultdict
 
-def analyze_code_style(code):
-    # Analyze Python code for basic inefficiencies and style issues.
-    suggestions = []
+from core.compile_cache import get_ast
 
-    try:
-        tree = ast.parse(code)
-    except SyntaxError:
-        return ["Could not analyze code due to syntax errors."]
+# Style checks are small rules hooked into a single AST pass.
+#   @rule(ast.Call, ...)  runs for every node of those types with the shared
+#                         analysis state, and records what it finds in it.
+#   @report               runs once after the pass and returns a suggestion
+#                         string or None. Reports run in registration order.
+# The walk tracks loop depth and name bindings as it goes, so every check
+# is linear in the size of the file.
+_NODE_RULES = defaultdict(list)
+_REPORTS = []
+
+LOOP_NODES = (ast.For, ast.AsyncFor, ast.While)
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+
+def rule(*node_types):
+    def register(fn):
+        for node_type in node_types:
+            _NODE_RULES[node_type].append(fn)
+        return fn
+    return register
+
+
+def report(fn):
+    _REPORTS.append(fn)
+    return fn
+
+
+def _new_state():
+    return {
+        "loop_depth": 0,
+        "max_loop_depth": 0,
+        "range_len": 0,
+        "magic_numbers": 0,
+        "print_calls": 0,
+        "imports": {},  # bound name -> module text shown to the user
+        "used_names": set(),
+    }
+
+
+# Walk with an explicit stack rather than NodeVisitor recursion: valid code
+# such as a 600-term `a + a + ...` nests deeper than Python's recursion limit.
+# Each entry carries the loop depth its node sits at.
+def _run_rules(tree, state):
+    stack = [(tree, 0)]
+    while stack:
+        node, loop_depth = stack.pop()
+        state["loop_depth"] = loop_depth
+        for fn in _NODE_RULES.get(type(node), ()):
+            fn(node, state)
+
+        if isinstance(node, SCOPE_NODES):
+            # A loop inside a function body isn't nested in the caller's loop
+            loop_depth = 0
+        elif isinstance(node, LOOP_NODES):
+            loop_depth += 1
+            state["max_loop_depth"] = max(state["max_loop_depth"], loop_depth)
+        # Reversed so children are popped, and reported, in source order
+        stack.extend((child, loop_depth) for child in reversed(list(ast.iter_child_nodes(node))))
+
+
+# Checks for nested loops
+@report
+def nested_loops(state):
+    if state["max_loop_depth"] >= 2:
+        return "⚙️ Consider reducing nested loops — they may slow down large datasets (O(n²) complexity)."
 
-    # Checks for nested loops
-    nested_loops = sum(isinstance(node, ast.For) and any(isinstance(child, ast.For) for child in ast.walk(node)) for node in ast.walk(tree))
-    if nested_loops > 0:
-        suggestions.append("⚙️ Consider reducing nested loops — they may slow down large datasets (O(n²) complexity).")
 
-    # Checks for range(len(...))
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "range":
-            if len(node.args) == 1 and isinstance(node.args[0], ast.Call) and isinstance(node.args[0].func, ast.Name) and node.args[0].func.id == "len":
-                suggestions.append("💡 You used `for i in range(len(x))`. Prefer `for item in x:` for cleaner, more Pythonic code.")
+# Checks for range(len(...))
+@rule(ast.Call)
+def find_range_len(node, state):
+    if isinstance(node.func, ast.Name) and node.func.id == "range":
+        if len(node.args) == 1 and isinstance(node.args[0], ast.Call) and isinstance(node.args[0].func, ast.Name) and node.args[0].func.id == "len":
+            state["range_len"] += 1
 
-    # Checks for hardcoded magic numbers
-    if re.search(r"\b\d{2,}\b", code):
-        suggestions.append("💡 Consider replacing hardcoded numbers with named constants for readability.")
+@report
+def range_len(state):
+    if state["range_len"]:
+        return "💡 You used `for i in range(len(x))`. Prefer `for item in x:` for cleaner, more Pythonic code."
 
-    # Checks for multiple print statements
-    if code.count("print(") > 3:
-        suggestions.append("💡 Too many print statements — consider using logging or formatted summary output.")
 
-    # Checks for unused imports
-    if re.search(r"import\s+\w+", code) and "used" not in code:
-        suggestions.append("💡 It seems you imported modules that are never used — clean them up to simplify your script.")
+# Checks for hardcoded magic numbers
+@rule(ast.Constant)
+def find_magic_numbers(node, state):
+    value = node.value
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and abs(value) >= 10:
+        state["magic_numbers"] += 1
+
+@report
+def magic_numbers(state):
+    if state["magic_numbers"]:
+        return "💡 Consider replacing hardcoded numbers with named constants for readability."
+
+
+# Checks for multiple print statements
+@rule(ast.Call)
+def count_prints(node, state):
+    if isinstance(node.func, ast.Name) and node.func.id == "print":
+        state["print_calls"] += 1
+
+@report
+def too_many_prints(state):
+    if state["print_calls"] > 3:
+        return "💡 Too many print statements — consider using logging or formatted summary output."
+
+
+# Checks for unused imports: names bound by import statements that are never read
+@rule(ast.Import)
+def bind_imports(node, state):
+    for alias in node.names:
+        # `import os.path` binds `os`
+        state["imports"].setdefault(alias.asname or alias.name.split(".")[0], alias.name)
+
+@rule(ast.ImportFrom)
+def bind_from_imports(node, state):
+    for alias in node.names:
+        if alias.name != "*":
+            state["imports"].setdefault(alias.asname or alias.name, alias.name)
+
+@rule(ast.Name)
+def record_name_use(node, state):
+    if not isinstance(node.ctx, ast.Store):
+        state["used_names"].add(node.id)
+
+@report
+def unused_imports(state):
+    unused = [module for name, module in state["imports"].items() if name not in state["used_names"]]
+    if unused:
+        names = ", ".join(f"`{module}`" for module in unused)
+        return f"💡 It seems you imported modules that are never used ({names}) — clean them up to simplify your script."
+
+
+def analyze_code_style(code):
+    # Analyze Python code for basic inefficiencies and style issues.
+    try:
+        # Shared with the grader, so a submission is only parsed once
+        tree = get_ast(code)
+    except (SyntaxError, ValueError):
+        return ["Could not analyze code due to syntax errors."]
+    except RecursionError:
+        # The parser itself gives up on extremely deep nesting
+        return ["Could not analyze code because it is nested too deeply."]
+
+    state = _new_state()
+    _run_rules(tree, state)
 
-    return suggestions if suggestions else ["✅ No major issues found — great job!"]
\ No newline at end of file
+    suggestions = [message for message in (fn(state) for fn in _REPORTS) if message]
+    return suggestions if suggestions else ["✅ No major issues found — great job!"]
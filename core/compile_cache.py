@@ -0,0 +1,77 @@
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Parsed ASTs and compiled code objects for submitted source, keyed by a hash
+# of the source text. The grader's workers, analyze_code_style() and the error
+# handler all go through here, so a submission run against many test cases
+# and then style-checked is parsed once per process.
+MAX_ENTRIES = 256
+FILENAME = "<user_code>"
+
+_entries = OrderedDict()
+_lock = threading.Lock()
+
+
+def source_key(source):
+    return hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def _entry(source):
+    key = source_key(source)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+            return entry
+
+    entry = {"tree": None, "code": None, "error": None, "compile_error": None}
+    try:
+        entry["tree"] = ast.parse(source, filename=FILENAME)
+    except (SyntaxError, ValueError) as e:
+        entry["error"] = e
+
+    with _lock:
+        # Keep whichever entry got stored first if another thread raced us
+        entry = _entries.setdefault(key, entry)
+        _entries.move_to_end(key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return entry
+
+
+def _raise(error):
+    # Re-raising the cached instance would keep growing its traceback
+    raise error.with_traceback(None)
+
+
+# The parsed module for `source`. The tree is shared, so callers must not
+# modify it. Raises the same SyntaxError ast.parse would.
+def get_ast(source):
+    entry = _entry(source)
+    if entry["tree"] is None:
+        _raise(entry["error"])
+    return entry["tree"]
+
+
+# The compiled code object for `source`, ready for exec().
+def get_code(source):
+    entry = _entry(source)
+    if entry["code"] is None:
+        if entry["tree"] is None:
+            _raise(entry["error"])
+        if entry["compile_error"] is not None:
+            _raise(entry["compile_error"])
+        try:
+            # Some errors (e.g. `return` outside a function) only show up here
+            entry["code"] = compile(entry["tree"], FILENAME, "exec")
+        except (SyntaxError, ValueError) as e:
+            entry["compile_error"] = e
+            _raise(e)
+    return entry["code"]
+
+
+def clear():
+    with _lock:
+        _entries.clear()
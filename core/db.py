@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import threading
+
+# Shared SQLite helpers for the on-disk stores in core/.
+# Streamlit runs every session in its own thread, so each thread keeps one
+# connection per database file. WAL mode lets readers proceed while another
+# session or process is writing.
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _open(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+# Return this thread's connection to `path`, running `init(conn)` the first
+# time the file is opened in this process (schema creation, migrations).
+def get_connection(path, init=None):
+    key = os.path.abspath(path)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    conn = conns.get(key)
+    if conn is None:
+        conn = conns[key] = _open(path)
+
+    if init is not None and (key, init) not in _schema_ready:
+        with _schema_lock:
+            if (key, init) not in _schema_ready:
+                init(conn)
+                _schema_ready.add((key, init))
+    return conn
+
+
+# Run `fn(conn)` inside one write transaction. BEGIN IMMEDIATE takes the
+# write lock up front so concurrent writers queue instead of failing midway.
+def write_transaction(conn, fn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = fn(conn)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return result
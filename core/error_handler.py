@@ -1,15 +1,27 @@
 import json
 import os
-import pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+import numpy as np
+
 from core.api_helper import explain_with_gemini
+from core.ai_helper import load_model, predict_error_category
+from core.error_record import coerce_error_record, describe_error, format_error
+from core.explanation_index import lookup_explanation
+from core.learning_log import LEARNING_DB, get_error_count, increment_error_count, record_labelled_error
 import streamlit as st 
 
 # File paths
 ERROR_DB = "data/errors.json"
-MODEL_PATH = "models/error_classifier.pkl"
-USER_LOG = "data/user_learning_log.json"
-EXPLANATION_DB = "data/error_explanations.json"
+
+# Both confidence thresholds are calibrated probabilities (see the
+# "calibration" block in the model manifest). On the hold-out split, 65% of
+# errors reach 0.7 and 92% of those are classified correctly.
+# Below this the model's guess is too weak to show, so fall through to Gemini
+MIN_MODEL_CONFIDENCE = float(os.getenv("EXPLAIN_MIN_MODEL_CONFIDENCE", "0.4"))
 
 
 # Log user mistakes and repetitions
@@ -18,53 +30,26 @@ def log_user_error(username, category):
     if not username or not category:
         return
 
-    if not os.path.exists(USER_LOG):
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(USER_LOG), exist_ok=True)
-        with open(USER_LOG, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-
     try:
-        with open(USER_LOG, "r", encoding="utf-8") as f:
-            try:
-                data = json.load(f)
-            except json.JSONDecodeError:
-                data = {}
-    except FileNotFoundError:
-         data = {} # Handle case where file might disappear between exists check and open
-
-    if username not in data:
-        data[username] = {}
-    data[username][category] = data[username].get(category, 0) + 1
-
-    try:
-        with open(USER_LOG, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        increment_error_count(username, category)
     except Exception as e:
-        print(f"⚠️ Failed to write to {USER_LOG}: {e}")
+        print(f"⚠️ Failed to record error count in {LEARNING_DB}: {e}")
 
 
 # Reinforcement logic
 # If user repeats same error multiple times, suggest concept revision.
+# Counts come from the in-memory copy, so reruns don't touch disk.
 def get_reinforcement_message(username, category):
-    if not username or not category or not os.path.exists(USER_LOG):
+    if not username or not category:
         return None
 
-    try:
-        with open(USER_LOG, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        count = data.get(username, {}).get(category, 0)
-
-        if count >= 3:
-            message = (
-                f" You've encountered **{category}** errors {count} times. "
-                "Consider reviewing this concept in the Learn section."
-            )
-            return message 
-            
-    except (json.JSONDecodeError, FileNotFoundError, Exception) as e:
-        print(f"⚠️ Error reading or processing {USER_LOG}: {e}")
-        pass
+    count = get_error_count(username, category)
+    if count >= 3:
+        message = (
+            f" You've encountered **{category}** errors {count} times. "
+            "Consider reviewing this concept in the Learn section."
+        )
+        return message
 
     return None
 
@@ -81,108 +66,175 @@ def load_errors():
         return []
 
 
-# Load AI model if available 
-def load_model():
-    if not os.path.exists(MODEL_PATH):
-        print(f"⚠️ Model file not found at: {MODEL_PATH}")
-        return None # Return None if file doesn't exist
-
+# Explanation tiers, cheapest first:
+#   index   the explanation DB, keyed on the exception type
+#   model   the local classifier
+#   gemini  the remote model
+# When neither local tier is confident, Gemini is started in the background
+# and given whatever is left of LATENCY_BUDGET_SECONDS. If it hasn't answered
+# by then, the best local answer is returned together with the pending
+# future, and the page swaps in Gemini's answer when it arrives.
+LATENCY_BUDGET_SECONDS = float(os.getenv("EXPLAIN_LATENCY_BUDGET_SECONDS", "1.5"))
+# Model answers below this confidence also ask Gemini, speculatively
+SPECULATE_BELOW_CONFIDENCE = float(os.getenv("EXPLAIN_SPECULATE_BELOW_CONFIDENCE", "0.7"))
+RECENT_LATENCIES = 500
+
+_remote_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="explain-remote")
+_tier_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record_tier(tier, seconds, hit):
+    with _stats_lock:
+        stats = _tier_stats.setdefault(tier, {"attempts": 0, "hits": 0, "latencies": deque(maxlen=RECENT_LATENCIES)})
+        stats["attempts"] += 1
+        stats["hits"] += int(bool(hit))
+        stats["latencies"].append(seconds)
+
+
+# Per tier: attempts, hit_rate, and median / p95 latency in milliseconds over
+# the most recent calls. "answered_*" entries count which tier produced the
+# answer a student saw first.
+def get_tier_stats():
+    with _stats_lock:
+        snapshot = {tier: (dict(stats), list(stats["latencies"])) for tier, stats in _tier_stats.items()}
+    report = {}
+    for tier, (stats, latencies) in snapshot.items():
+        ms = np.percentile(latencies, [50, 95]) * 1000 if latencies else (0.0, 0.0)
+        report[tier] = {
+            "attempts": stats["attempts"],
+            "hit_rate": stats["hits"] / stats["attempts"] if stats["attempts"] else 0.0,
+            "p50_ms": float(ms[0]),
+            "p95_ms": float(ms[1]),
+        }
+    return report
+
+
+def _result(explanation, hint, example, category, tier, pending=None):
+    return {"explanation": explanation, "hint": hint, "example": example, "category": category, "tier": tier, "pending": pending}
+
+
+def _with_reinforcement(text, username, category):
+    log_user_error(username, category)
+    reinforcement = get_reinforcement_message(username, category)
+    return text + (f"\n\n{reinforcement}" if reinforcement else "")
+
+
+def _index_tier(record, error_message):
+    start = time.perf_counter()
+    entry = None
     try:
-        with open(MODEL_PATH, "rb") as f:
-            # Load the entire pipeline object directly
-            pipeline_model = pickle.load(f)
-        # Check if it's a scikit-learn pipeline 
-        if hasattr(pipeline_model, 'predict') and hasattr(pipeline_model, 'transform'):
-             print("✅ Model pipeline loaded successfully.")
-             return pipeline_model # Return the loaded pipeline
-        else:
-             print(f"⚠️ Loaded object from {MODEL_PATH} is not a valid scikit-learn pipeline.")
-             return None
+        entry = lookup_explanation(error_message, record["exc_type"])
     except Exception as e:
-        print(f"⚠️ Model loading failed from {MODEL_PATH}: {e}")
-        return None # Return None on error
+        print(f"⚠️ Could not load or process explanation DB: {e}")
+    _record_tier("index", time.perf_counter() - start, entry is not None)
+    return entry
 
 
-# Explain error with model or fallback
-# Explain an error using local explanation DB, ML model, or Gemini fallback.
-def explain_error(error_message, username=None):
-    pipeline_model = load_model() 
-
-    if os.path.exists(EXPLANATION_DB):
-        try:
-            with open(EXPLANATION_DB, "r", encoding="utf-8") as f:
-                explanations = json.load(f)
-
-            for category, info in explanations.items():
-                error_lower = error_message.lower()
-                cat_lower = category.lower()
-                cat_no_error_lower = cat_lower.replace("error", "")
-
-                if cat_lower in error_lower or (cat_no_error_lower and cat_no_error_lower in error_lower):
-                    log_user_error(username, category)
-                    reinforcement = get_reinforcement_message(username, category)
-
-                    meaning = info.get("meaning", "No specific meaning available.")
-                    cause = info.get("cause", "No specific cause listed.")
-                    fixes = info.get("fix", [])
-                    example = info.get("example", "")
-
-                    formatted_explanation = (
-                        f"### 🧠 What it means:\n{meaning}\n\n"
-                        f"### ⚙️ Why it happens:\n{cause}\n\n"
-                        f"### 🛠️ How to fix it:\n"
-                        + "".join([f"- {fix}\n" for fix in fixes])
-                    )
-                    return (
-                        formatted_explanation + (f"\n\n{reinforcement}" if reinforcement else ""),
-                        "Here’s a detailed explanation of your error.",
-                        example,
-                        category # Return the matched category
-                    )
-        except Exception as e:
-            print(f"⚠️ Could not load or process explanation DB: {e}")
-
-
-    if pipeline_model: # Check if the model loaded
-        try:
-            predicted_category = pipeline_model.predict([error_message])[0]
-
-            log_user_error(username, predicted_category)
-            reinforcement = get_reinforcement_message(username, predicted_category)
-
-            explanation = f"AI predicts this might be a **{predicted_category}**."
-            fix_hint = "💡 Try reviewing this concept in the Concepts section, or check the explanation database."
-
-            return (
-                explanation + (f"\n\n{reinforcement}" if reinforcement else ""),
-                fix_hint,
-                None, 
-                predicted_category 
-            )
-        except Exception as e:
-            print(f"⚠️ AI prediction failed: {e}")
+# The model's prediction, or None if there is no model or it failed.
+def _model_tier(error_message):
+    if load_model() is None: # Check if the model loaded
+        return None
+    start = time.perf_counter()
+    try:
+        prediction = predict_error_category(error_message)
+    except Exception as e:
+        print(f"⚠️ AI prediction failed: {e}")
+        prediction = None
+    confident = prediction is not None and prediction["category"] is not None \
+        and prediction["confidence"] >= SPECULATE_BELOW_CONFIDENCE
+    _record_tier("model", time.perf_counter() - start, confident)
+    return prediction
 
 
-    print("Falling back to Gemini API...")
+# Runs on the remote pool; never touches Streamlit.
+def _gemini_tier(record):
+    start = time.perf_counter()
     try:
         gemini_prompt = (
             f"Explain this Python error in simple terms for a beginner:\n\n"
-            f"Error message: `{error_message}`\n\n"
+            f"Error message: {describe_error(record)}\n\n"
             f"Focus on what likely caused it and how to fix it."
         )
-        with st.spinner("Asking Gemini for a simpler explanation..."):
-             gemini_explanation = explain_with_gemini(gemini_prompt)
-
+        gemini_explanation = explain_with_gemini(gemini_prompt)
         if gemini_explanation.startswith("⚠️"):
-             hint = "Could not get explanation from Gemini."
-             category = None 
+            result = _result(gemini_explanation, "Could not get explanation from Gemini.", None, None, "gemini_failed")
         else:
-             hint = "Explanation provided by Gemini AI."
-             category = None 
-
-        return gemini_explanation, hint, None, category
-
+            result = _result(gemini_explanation, "Explanation provided by Gemini AI.", None, None, "gemini")
     except Exception as e:
         print(f"⚠️ Gemini fallback failed: {e}")
-        return "⚠️ Could not get an explanation.", f"Error during Gemini fallback: {str(e)}", None, None
+        result = _result("⚠️ Could not get an explanation.", f"Error during Gemini fallback: {str(e)}", None, None, "gemini_failed")
+    _record_tier("gemini", time.perf_counter() - start, result["tier"] == "gemini")
+    return result
+
+
+def _answered(result, start):
+    seconds = time.perf_counter() - start
+    _record_tier(f"answered_{result['tier']}", seconds, True)
+    print(f"⏱️ Explanation from {result['tier']} tier in {seconds * 1000:.0f} ms"
+          + (" (Gemini still running)" if result["pending"] is not None else ""))
+    return result
+
+
+# Explain an error within `budget` seconds (None waits for every tier).
+# `error` is an error record from the sandbox (core/error_record.py) or a
+# plain error message. Returns a dict with explanation, hint, example,
+# category, the tier that answered, and `pending`: a future for Gemini's
+# answer when the budget ran out first, else None.
+def resolve_error(error, username=None, budget=LATENCY_BUDGET_SECONDS):
+    start = time.perf_counter()
+    record = coerce_error_record(error)
+    error_message = format_error(record)
+
+    entry = _index_tier(record, error_message)
+    if entry is not None:
+        category = entry["category"]
+        record_labelled_error(error_message, category, source="explanation_index")
+        result = _result(
+            _with_reinforcement(entry["markdown"], username, category),
+            "Here’s a detailed explanation of your error.",
+            entry["example"],
+            category, # Return the matched category
+            "index",
+        )
+        return _answered(result, start)
+
+    prediction = _model_tier(error_message)
+    local = None
+    if prediction is not None and prediction["category"] is not None and prediction["confidence"] >= MIN_MODEL_CONFIDENCE:
+        predicted_category = prediction["category"]
+        explanation = f"AI predicts this might be a **{predicted_category}** ({prediction['confidence']:.0%} confidence)."
+        fix_hint = "💡 Try reviewing this concept in the Concepts section, or check the explanation database."
+        local = _result(_with_reinforcement(explanation, username, predicted_category), fix_hint, None, predicted_category, "model")
+        if prediction["confidence"] >= SPECULATE_BELOW_CONFIDENCE:
+            return _answered(local, start)
+
+    print("Asking Gemini API...")
+    future = _remote_pool.submit(_gemini_tier, record)
+    remaining = None if budget is None else max(0.0, budget - (time.perf_counter() - start))
+    try:
+        with st.spinner("Asking Gemini for a simpler explanation..."):
+            remote = future.result(timeout=remaining)
+    except FuturesTimeout:
+        if local is None:
+            local = _result(
+                f"⏳ Looking for an explanation of `{error_message}`...",
+                "A detailed explanation will appear here shortly.",
+                None, None, "pending",
+            )
+        local["pending"] = future
+        return _answered(local, start)
 
+    if local is not None and remote["tier"] != "gemini":
+        # Gemini failed; the model's guess is still better than nothing
+        return _answered(local, start)
+    if local is not None:
+        remote["category"] = local["category"]
+    return _answered(remote, start)
+
+
+# Explain error with model or fallback
+# Waits for every tier it needs; returns (explanation, hint, example, category).
+def explain_error(error, username=None):
+    result = resolve_error(error, username, budget=None)
+    return result["explanation"], result["hint"], result["example"], result["category"]
@@ -0,0 +1,97 @@
+import ast
+import traceback
+
+from core.compile_cache import FILENAME, get_ast
+from core.explanation_index import extract_exception_type
+
+# A failure of a student's program as structured fields instead of str(e):
+#   exc_type   exception class name ("KeyError")
+#   message    str(e), or the bare message for syntax errors ("'name'")
+#   line       1-based line in the student's code that failed, if known
+#   line_text  that line, stripped
+#   node_type  AST node the error points at ("Subscript", "Call", ...)
+# Built once per failure in the sandbox worker, then used by the classifier,
+# the explanation index and the AI prompt (and so its cache key).
+
+
+def make_error_record(exc_type, message, line=None, line_text=None, node_type=None):
+    return {"exc_type": exc_type, "message": message, "line": line, "line_text": line_text, "node_type": node_type}
+
+
+# (line, col, end_line, end_col) of the innermost frame in the student's code.
+# Columns come from the 3.11+ position tables and are None before that.
+def _failing_position(exc):
+    if isinstance(exc, SyntaxError):
+        return (exc.lineno, None, None, None) if exc.filename == FILENAME else None
+    frames = [f for f in traceback.extract_tb(exc.__traceback__) if f.filename == FILENAME]
+    if not frames:
+        return None
+    frame = frames[-1]
+    return (frame.lineno, getattr(frame, "colno", None), getattr(frame, "end_lineno", None), getattr(frame, "end_colno", None))
+
+
+def _span(node):
+    return (node.end_lineno - node.lineno, node.end_col_offset - node.col_offset)
+
+
+# The smallest node covering the failing range; without columns, the
+# innermost statement on the line.
+def _node_at(tree, line, col, end_line, end_col):
+    best = None
+    for node in ast.walk(tree):
+        if getattr(node, "end_lineno", None) is None:
+            continue
+        if col is not None and end_line is not None and end_col is not None:
+            covers = (node.lineno, node.col_offset) <= (line, col) and (node.end_lineno, node.end_col_offset) >= (end_line, end_col)
+        else:
+            covers = isinstance(node, ast.stmt) and node.lineno <= line <= node.end_lineno
+        if covers and (best is None or _span(node) <= _span(best)):
+            best = node
+    return type(best).__name__ if best is not None else None
+
+
+def build_error_record(exc, source):
+    message = exc.msg if isinstance(exc, SyntaxError) else str(exc)
+    record = make_error_record(type(exc).__name__, message)
+    position = _failing_position(exc)
+    if position is None or not position[0]:
+        return record
+
+    line = position[0]
+    lines = source.splitlines()
+    record["line"] = line
+    if 1 <= line <= len(lines):
+        record["line_text"] = lines[line - 1].strip()
+    try:
+        # Cached by the compile cache, so this doesn't parse the code again
+        record["node_type"] = _node_at(get_ast(source), *position)
+    except (SyntaxError, ValueError):
+        pass
+    return record
+
+
+# Accepts a record or a plain error string (older callers, pasted messages).
+def coerce_error_record(error):
+    if isinstance(error, dict):
+        return error
+    message = "" if error is None else str(error)
+    return make_error_record(extract_exception_type(message), message)
+
+
+# "KeyError: 'name'" - what the classifier and the student see.
+def format_error(record):
+    exc_type, message = record.get("exc_type"), record.get("message") or ""
+    if not exc_type or message.startswith(exc_type):
+        return message
+    return f"{exc_type}: {message}" if message else exc_type
+
+
+# Longer description with the failing line, for AI prompts. The line number
+# is left out so the same mistake on a shifted line shares a cache entry.
+def describe_error(record):
+    text = format_error(record)
+    if record.get("line_text"):
+        text += f"\nIt was raised on this line: `{record['line_text']}`"
+        if record.get("node_type"):
+            text += f" ({record['node_type']} node)"
+    return text
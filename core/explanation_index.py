@@ -0,0 +1,119 @@
+import builtins
+import json
+import re
+
+from core.file_cache import load_cached
+
+EXPLANATION_DB = "data/error_explanations.json"
+
+_EXC_NAME = r"[A-Z][A-Za-z0-9_]*(?:Error|Exception|Warning|Exit|Interrupt)"
+_EXC_TYPE_RE = re.compile(rf"\b({_EXC_NAME})\b")
+# The raised exception at the start of a line: "KeyError: 'x'",
+# "builtins.KeyError: ...", or a bare "KeyError"
+_RAISED_RE = re.compile(rf"^\s*(?:[A-Za-z_][\w.]*\.)?({_EXC_NAME})\s*(?::|$)")
+
+
+# Render the markdown shown to the student once, when the catalogue is loaded.
+def render_explanation(info):
+    meaning = info.get("meaning", "No specific meaning available.")
+    cause = info.get("cause", "No specific cause listed.")
+    fixes = info.get("fix", [])
+    return (
+        f"### 🧠 What it means:\n{meaning}\n\n"
+        f"### ⚙️ Why it happens:\n{cause}\n\n"
+        f"### 🛠️ How to fix it:\n"
+        + "".join([f"- {fix}\n" for fix in fixes])
+    )
+
+
+# Build the lookup structures for one version of the explanation DB:
+#   by_type  - exact exception class name -> entry
+#   matcher  - one compiled regex over every category keyword, used when the
+#              message carries no recognisable exception type
+def build_index(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            explanations = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not load or process explanation DB: {e}")
+        return None
+
+    by_type = {}
+    keywords = {}
+    for category, info in explanations.items():
+        by_type[category] = {
+            "category": category,
+            "markdown": render_explanation(info),
+            "example": info.get("example", ""),
+        }
+        # Same keywords as the old substring scan: "nameerror" and "name"
+        cat_lower = category.lower()
+        for keyword in (cat_lower, cat_lower.replace("error", "")):
+            # The first category listed keeps a shared keyword
+            if keyword and keyword not in keywords:
+                keywords[keyword] = category
+
+    matcher = None
+    if keywords:
+        # Longest keywords first so "nameerror" wins over "name" at the same position
+        alternatives = sorted(keywords, key=len, reverse=True)
+        matcher = re.compile("|".join(re.escape(k) for k in alternatives), re.IGNORECASE)
+
+    return {"by_type": by_type, "keywords": keywords, "matcher": matcher}
+
+
+def load_explanation_index():
+    return load_cached(EXPLANATION_DB, build_index)
+
+
+# Pull the exception class name out of an error message, if it has one.
+# Names inside the message ("'KeyError' object has no attribute ...") only
+# count when no line starts with a raised exception.
+def extract_exception_type(error_message):
+    lines = [line for line in (error_message or "").splitlines() if line.strip()]
+    if not lines:
+        return None
+    # In a traceback the raised exception is on the last line
+    match = _RAISED_RE.match(lines[-1])
+    if match:
+        return match.group(1)
+    matches = _EXC_TYPE_RE.findall(error_message)
+    return matches[-1] if matches else None
+
+
+def _lookup_type(by_type, exc_type):
+    entry = by_type.get(exc_type)
+    if entry is not None:
+        return entry
+    # UnboundLocalError -> NameError, IndentationError -> SyntaxError, ...
+    exc_class = getattr(builtins, exc_type, None)
+    if isinstance(exc_class, type) and issubclass(exc_class, BaseException):
+        for base in exc_class.__mro__[1:]:
+            entry = by_type.get(base.__name__)
+            if entry is not None:
+                return entry
+    return None
+
+
+# Find the catalogue entry for an error message, or None if nothing matches.
+# A known exception class (from an error record) is a direct dictionary hit,
+# and its message is not keyword-scanned ("No module named" isn't a NameError).
+def lookup_explanation(error_message, exc_type=None):
+    index = load_explanation_index()
+    if not index or not (error_message or exc_type):
+        return None
+
+    if exc_type:
+        return _lookup_type(index["by_type"], exc_type)
+
+    exc_type = extract_exception_type(error_message)
+    if exc_type:
+        entry = _lookup_type(index["by_type"], exc_type)
+        if entry is not None:
+            return entry
+
+    if index["matcher"] is not None:
+        match = index["matcher"].search(error_message)
+        if match:
+            return index["by_type"][index["keywords"][match.group(0).lower()]]
+    return None
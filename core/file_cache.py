@@ -0,0 +1,53 @@
+import os
+import threading
+
+# Process-wide cache of objects built from files on disk.
+# Every Streamlit session runs in the same process, so a loader registered here
+# runs once per process and again only when the file's mtime changes.
+_entries = {}
+_lock = threading.Lock()
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+# Return loader(path), reusing the previous result while the file is unchanged.
+# A missing file is never cached so it is picked up as soon as it appears.
+def load_cached(path, loader):
+    stamp = _file_stamp(path)
+    key = (os.path.abspath(path), loader)
+
+    entry = _entries.get(key)
+    if entry is not None and stamp is not None and entry[0] == stamp:
+        return entry[1]
+
+    with _lock:
+        # Another thread may have reloaded it while we were waiting
+        entry = _entries.get(key)
+        stamp = _file_stamp(path)
+        if entry is not None and stamp is not None and entry[0] == stamp:
+            return entry[1]
+
+        value = loader(path)
+        if stamp is not None:
+            # Failed loads are cached too so a bad file is not re-read per call
+            _entries[key] = (stamp, value)
+        else:
+            _entries.pop(key, None)
+        return value
+
+
+# Drop cached objects for one file (or everything), e.g. after retraining.
+def invalidate(path=None):
+    with _lock:
+        if path is None:
+            _entries.clear()
+            return
+        target = os.path.abspath(path)
+        for key in [k for k in _entries if k[0] == target]:
+            del _entries[key]
@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from core.error_record import make_error_record
+from core.sandbox import DEFAULT_TIMEOUT_SECONDS, POOL_SIZE, run_code
+
+# Headless grading engine: runs a submission against a task's test cases in
+# the sandbox pool, several cases at once, and yields each result as soon as
+# it finishes. Used by the Exercises page and by scripts/bench_grader.py.
+
+
+# collapse whitespace, strip.
+def normalize_text(s):
+    if s is None:
+        return ""
+    if not isinstance(s, str):
+        s = str(s)
+    return " ".join(s.strip().split())
+
+def compare_outputs(user_out, expected_out):
+    return normalize_text(user_out) == normalize_text(expected_out)
+
+
+def grade_case(code, index, case, timeout=DEFAULT_TIMEOUT_SECONDS):
+    start = time.perf_counter()
+    result = run_code(code, case.get("input", ""), timeout=timeout)
+    return _case_result(index, case, result, time.perf_counter() - start)
+
+
+def _case_result(index, case, result, seconds):
+    expected = case.get("expected_output", "")
+    output = result["stdout"].rstrip("\n")
+    if not result["ok"]:
+        passed = False
+    elif expected != "":  # Only compare if expected output is defined
+        passed = compare_outputs(output, expected)
+    else:
+        passed = True  # Code ran without error and no output was expected
+
+    return {
+        "index": index,
+        "input": case.get("input", ""),
+        "expected": expected,
+        "output": output,
+        "ok": result["ok"],
+        "passed": passed,
+        "error": result["error"],
+        "exc_type": result["exc_type"],
+        "traceback": result["traceback"],
+        "error_record": result["error_record"],
+        "timed_out": result["timed_out"],
+        "seconds": seconds,
+    }
+
+
+# A case whose grading raised (not the student's code: that is caught in the
+# sandbox) still gets a failed result, so one case can't abort the whole run.
+def _grading_failure(index, case, exc):
+    message = f"Grading failure: {exc}"
+    result = {"ok": False, "stdout": "", "error": message, "exc_type": type(exc).__name__, "traceback": None,
+              "error_record": make_error_record(type(exc).__name__, message), "timed_out": False}
+    return _case_result(index, case, result, 0.0)
+
+
+# Yield one result dict per test case, in completion order. `index` is the
+# 1-based position of the case. With fail_fast the first failing case stops
+# the run and cases that have not started yet are skipped. Closing the
+# generator early (e.g. `break` inside `closing(...)`) also cancels them.
+def iter_grade(code, test_cases, timeout=DEFAULT_TIMEOUT_SECONDS, fail_fast=False, max_workers=POOL_SIZE):
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(test_cases) or 1)))
+    cases = {
+        executor.submit(grade_case, code, i, case, timeout): (i, case)
+        for i, case in enumerate(test_cases, start=1)
+    }
+    pending = set(cases)
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in sorted(done, key=lambda f: cases[f][0]):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"⚠️ Grading test case #{cases[future][0]} failed: {e}")
+                    result = _grading_failure(*cases[future], e)
+                yield result
+                if fail_fast and not result["passed"]:
+                    return
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Grade every case and return a summary with results in test-case order.
+def grade(code, test_cases, timeout=DEFAULT_TIMEOUT_SECONDS, fail_fast=False, max_workers=POOL_SIZE):
+    start = time.perf_counter()
+    results = list(iter_grade(code, test_cases, timeout=timeout, fail_fast=fail_fast, max_workers=max_workers))
+    results.sort(key=lambda r: r["index"])
+    return {
+        "results": results,
+        "passed": sum(1 for r in results if r["passed"]),
+        "total": len(test_cases),
+        "aborted": len(results) < len(test_cases),
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+
+from core.db import get_connection, write_transaction
+
+# Per-user error counters ("how often has this user hit a KeyError").
+# Each increment is a single UPSERT, so concurrent sessions and processes
+# never lose counts. Reads are served from an in-memory copy per user that is
+# refreshed from disk at most every CACHE_TTL_SECONDS; increments made in this
+# process update it immediately with the count the database returned.
+LEARNING_DB = "data/learning_log.db"
+LEGACY_USER_LOG = "data/user_learning_log.json"
+CACHE_TTL_SECONDS = 30.0
+
+_cache = {}  # username -> {"counts": {category: count}, "loaded_at": float}
+_cache_lock = threading.Lock()
+
+
+def _init_db(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS error_counts ("
+        "username TEXT NOT NULL, category TEXT NOT NULL, count INTEGER NOT NULL, "
+        "PRIMARY KEY (username, category))"
+    )
+    # Error messages whose category is known (matched by the explanation
+    # index); train_error_classifier.py --mode incremental learns from them
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS labelled_errors ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, category TEXT NOT NULL, "
+        "source TEXT, created_at REAL NOT NULL, UNIQUE (message, category))"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    migrate_legacy_log(conn)
+
+
+def _connect():
+    return get_connection(LEARNING_DB, _init_db)
+
+
+# One-shot import of data/user_learning_log.json ({user: {category: count}}).
+# Runs once per database; the JSON file is left in place as a backup.
+def migrate_legacy_log(conn, json_path=LEGACY_USER_LOG):
+    if not os.path.exists(json_path):
+        return 0
+
+    def _migrate(conn):
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_migrated'").fetchone():
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+                data = json.loads(content) if content else {}
+        except json.JSONDecodeError:
+            print(f"⚠️ Could not decode {json_path}, skipping migration.")
+            data = {}
+        rows = [
+            (username, category, int(count))
+            for username, counts in data.items() if isinstance(counts, dict)
+            for category, count in counts.items()
+        ]
+        conn.executemany(
+            "INSERT INTO error_counts (username, category, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (username, category) DO UPDATE SET count = count + excluded.count",
+            rows,
+        )
+        conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', ?)", (json_path,))
+        return len(rows)
+
+    migrated = write_transaction(conn, _migrate)
+    if migrated:
+        print(f"✅ Migrated {migrated} error counters from {json_path} to {LEARNING_DB}.")
+    return migrated
+
+
+# Atomically add `amount` to a user's counter and return the new count.
+def increment_error_count(username, category, amount=1):
+    def _increment(conn):
+        conn.execute(
+            "INSERT INTO error_counts (username, category, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (username, category) DO UPDATE SET count = count + excluded.count",
+            (username, category, amount),
+        )
+        row = conn.execute(
+            "SELECT count FROM error_counts WHERE username = ? AND category = ?", (username, category)
+        ).fetchone()
+        return row["count"]
+
+    count = write_transaction(_connect(), _increment)
+    with _cache_lock:
+        entry = _cache.get(username)
+        if entry is not None:
+            entry["counts"][category] = count
+    return count
+
+
+def _load_counts(username):
+    rows = _connect().execute(
+        "SELECT category, count FROM error_counts WHERE username = ?", (username,)
+    ).fetchall()
+    return {row["category"]: row["count"] for row in rows}
+
+
+# All of a user's counters as {category: count}. Served from memory while
+# the cached copy is fresh.
+def get_error_counts(username):
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(username)
+        if entry is not None and now - entry["loaded_at"] < CACHE_TTL_SECONDS:
+            return dict(entry["counts"])
+
+    try:
+        counts = _load_counts(username)
+    except Exception as e:
+        print(f"⚠️ Failed to read error counts from {LEARNING_DB}: {e}")
+        return dict(entry["counts"]) if entry is not None else {}
+
+    with _cache_lock:
+        _cache[username] = {"counts": counts, "loaded_at": now}
+    return dict(counts)
+
+
+def get_error_count(username, category):
+    return get_error_counts(username).get(category, 0)
+
+
+# Remember an error message and its known category for retraining. Repeats
+# of the same (message, category) pair are stored once.
+def record_labelled_error(message, category, source=None):
+    try:
+        write_transaction(
+            _connect(),
+            lambda conn: conn.execute(
+                "INSERT OR IGNORE INTO labelled_errors (message, category, source, created_at) VALUES (?, ?, ?, ?)",
+                (message, category, source, time.time()),
+            ),
+        )
+    except Exception as e:
+        print(f"⚠️ Failed to record labelled error in {LEARNING_DB}: {e}")
+
+
+# Labelled errors recorded after row `after_id`, oldest first, as dicts with
+# id, message and category.
+def load_labelled_errors(after_id=0):
+    rows = _connect().execute(
+        "SELECT id, message, category FROM labelled_errors WHERE id > ? ORDER BY id", (after_id,)
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def invalidate_cache(username=None):
+    with _cache_lock:
+        if username is None:
+            _cache.clear()
+        else:
+            _cache.pop(username, None)
@@ -0,0 +1,352 @@
+import json
+import os
+import re
+import shutil
+import time
+from functools import lru_cache
+
+import numpy as np
+
+# On-disk format for the error classifier: a directory with a JSON manifest
+# and one .npy file per array.
+#   manifest.json    format version, labels, vectorizer settings, how scores
+#                    become probabilities (and Platt calibration, if any),
+#                    training metrics, array index
+#   vocabulary.npy   sorted terms; a term's position is its feature index
+#                    (TF-IDF models only; hashing models have no vocabulary)
+#   idf.npy          per-feature IDF weights (TF-IDF models only)
+#   coef_*.npy       coefficients as a CSR matrix of shape (features, classes)
+#                    so a document only reads the rows of its own terms
+#   intercept.npy    per-class intercepts
+# Arrays are memory-mapped, so loading is near-instant and worker processes
+# share the same pages through the OS cache. Inference below needs only NumPy;
+# scikit-learn is imported only to export a fitted pipeline.
+ARTIFACT_PATH = "models/error_classifier"
+MANIFEST_NAME = "manifest.json"
+FORMAT_NAME = "error-classifier"
+# Version 2 added the optional "calibration" block; version 1 still loads
+FORMAT_VERSION = 2
+
+_VECTORIZER_SETTINGS = ("lowercase", "token_pattern", "ngram_range", "norm", "binary")
+
+
+# Manifest settings and arrays for a fitted vectorizer, plus the column order
+# that sorts its vocabulary.
+def _describe_vectorizer(vectorizer):
+    name = type(vectorizer).__name__
+    params = vectorizer.get_params()
+    unsupported = [
+        key for key in ("preprocessor", "tokenizer", "stop_words", "strip_accents")
+        if params.get(key) is not None
+    ]
+    if params.get("analyzer") != "word" or unsupported:
+        raise ValueError(f"{name} settings are not supported by the artifact format: analyzer="
+                         f"{params.get('analyzer')!r}, custom {unsupported}")
+
+    settings = {key: params[key] for key in _VECTORIZER_SETTINGS}
+    settings["ngram_range"] = list(settings["ngram_range"])
+
+    if name == "HashingVectorizer":
+        settings.update(kind="hashing", n_features=params["n_features"], alternate_sign=params["alternate_sign"])
+        return settings, {}, None
+
+    if name == "TfidfVectorizer":
+        settings.update(kind="tfidf", use_idf=params["use_idf"], sublinear_tf=params["sublinear_tf"])
+        terms = sorted(vectorizer.vocabulary_)
+        order = np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int64)
+        arrays = {"vocabulary": np.array(terms, dtype=str)}
+        if params["use_idf"]:
+            arrays["idf"] = np.asarray(vectorizer.idf_, dtype=np.float64)[order]
+        return settings, arrays, order
+
+    raise ValueError(f"Unsupported vectorizer for the artifact format: {name}")
+
+
+def _describe_classifier(clf):
+    name = type(clf).__name__
+    if name == "CalibratedClassifierCV":
+        return _describe_calibrated(clf)
+    if hasattr(clf, "feature_log_prob_") and name == "MultinomialNB":
+        # Joint log likelihood is linear in the term weights
+        coef, intercept, probability = clf.feature_log_prob_, clf.class_log_prior_, "softmax"
+    elif hasattr(clf, "coef_"):
+        coef, intercept = clf.coef_, np.broadcast_to(clf.intercept_, (clf.coef_.shape[0],))
+        logistic = name == "LogisticRegression" and len(clf.classes_) == 2
+        logistic = logistic or (name == "SGDClassifier" and clf.loss == "log_loss")
+        # Same probabilities as predict_proba for logistic models; a softmax
+        # over decision scores for margin classifiers such as LinearSVC
+        probability = "ovr_logistic" if logistic else "softmax"
+    else:
+        raise ValueError(f"Unsupported classifier for the artifact format: {name}")
+
+    coef = coef.toarray() if hasattr(coef, "toarray") else np.asarray(coef)
+    return {"type": name, "probability": probability}, np.asarray(coef, dtype=np.float64), np.asarray(intercept, dtype=np.float64)
+
+
+# A sigmoid-calibrated linear model: the base model's arrays plus one Platt
+# scaling (a, b) per class, p = 1 / (1 + exp(a * score + b)), applied to the
+# base model's decision scores (or its probabilities, for naive Bayes).
+def _describe_calibrated(clf):
+    if clf.method != "sigmoid" or len(clf.calibrated_classifiers_) != 1:
+        raise ValueError("Only CalibratedClassifierCV(method='sigmoid', ensemble=False) can be exported")
+    calibrated = clf.calibrated_classifiers_[0]
+    settings, coef, intercept = _describe_classifier(calibrated.estimator)
+    settings["calibration"] = {
+        "method": "sigmoid",
+        "input": "decision" if hasattr(calibrated.estimator, "decision_function") else "proba",
+        "a": [float(c.a_) for c in calibrated.calibrators],
+        "b": [float(c.b_) for c in calibrated.calibrators],
+    }
+    return settings, coef, intercept
+
+
+def _csr_arrays(dense):
+    rows, cols = np.nonzero(dense)
+    indptr = np.zeros(dense.shape[0] + 1, dtype=np.int32 if rows.size < 2 ** 31 else np.int64)
+    np.cumsum(np.bincount(rows, minlength=dense.shape[0]), out=indptr[1:])
+    return {
+        "coef_indptr": indptr,
+        "coef_indices": cols.astype(np.int32),
+        "coef_data": dense[rows, cols],
+    }
+
+
+# Write `pipeline` as an artifact directory at `path`. The new directory is
+# built next to the old one and swapped in, so readers never see half a model.
+def export_artifact(pipeline, path=ARTIFACT_PATH, metrics=None, source=None):
+    import sklearn
+
+    vectorizer, clf = pipeline[0], pipeline[-1]
+    vectorizer_settings, arrays, order = _describe_vectorizer(vectorizer)
+    classifier_settings, coef, intercept = _describe_classifier(clf)
+    if order is not None:
+        coef = coef[:, order]
+    # Stored as (features, classes)
+    arrays.update(_csr_arrays(np.ascontiguousarray(coef.T)))
+    arrays["intercept"] = intercept
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "sklearn_version": sklearn.__version__,
+        "source": source,
+        "labels": [str(c) for c in clf.classes_],
+        "n_features": int(coef.shape[1]),
+        "vectorizer": vectorizer_settings,
+        "classifier": classifier_settings,
+        "metrics": metrics or {},
+        "arrays": {name: {"file": f"{name}.npy", "dtype": str(a.dtype), "shape": list(a.shape)} for name, a in arrays.items()},
+    }
+
+    path = os.path.normpath(path)
+    tmp, old = f"{path}.tmp", f"{path}.old"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), array, allow_pickle=False)
+    with open(os.path.join(tmp, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def manifest_path(path=ARTIFACT_PATH):
+    return os.path.join(path, MANIFEST_NAME)
+
+
+# Load an artifact as {"manifest", "arrays"}; arrays are read-only memory maps.
+def load_artifact(path=ARTIFACT_PATH):
+    with open(manifest_path(path), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not an error classifier artifact")
+    if not 1 <= manifest.get("version", 0) <= FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact version {manifest.get('version')} (expected 1 to {FORMAT_VERSION})")
+
+    arrays = {
+        name: np.load(os.path.join(path, spec["file"]), mmap_mode="r", allow_pickle=False)
+        for name, spec in manifest["arrays"].items()
+    }
+    return {"manifest": manifest, "arrays": arrays}
+
+
+# MurmurHash3 (x86, 32-bit, signed), as used by scikit-learn's HashingVectorizer.
+@lru_cache(maxsize=65536)
+def _murmurhash3_32(token, seed=0):
+    data = token.encode("utf-8")
+    length = len(data)
+    h = seed & 0xFFFFFFFF
+    c1, c2 = 0xCC9E2D51, 0x1B873593
+    tail_start = length - length % 4
+    for i in range(0, tail_start, 4):
+        k = int.from_bytes(data[i:i + 4], "little")
+        k = (k * c1) & 0xFFFFFFFF
+        k = ((k << 15) | (k >> 17)) & 0xFFFFFFFF
+        k = (k * c2) & 0xFFFFFFFF
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & 0xFFFFFFFF
+        h = (h * 5 + 0xE6546B64) & 0xFFFFFFFF
+    k = 0
+    tail = data[tail_start:]
+    if len(tail) == 3:
+        k ^= tail[2] << 16
+    if len(tail) >= 2:
+        k ^= tail[1] << 8
+    if tail:
+        k ^= tail[0]
+        k = (k * c1) & 0xFFFFFFFF
+        k = ((k << 15) | (k >> 17)) & 0xFFFFFFFF
+        k = (k * c2) & 0xFFFFFFFF
+        h ^= k
+    h ^= length
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+@lru_cache(maxsize=8)
+def _compile_pattern(pattern):
+    return re.compile(pattern)
+
+
+# Word n-grams exactly as scikit-learn's "word" analyzer builds them.
+def _terms(text, settings):
+    if settings["lowercase"]:
+        text = text.lower()
+    tokens = _compile_pattern(settings["token_pattern"]).findall(text)
+    min_n, max_n = settings["ngram_range"]
+    if max_n == 1:
+        return tokens
+    terms = list(tokens) if min_n == 1 else []
+    for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+        terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    return terms
+
+
+# Feature indices and signed weights of one document's terms.
+def _term_features(terms, artifact):
+    settings = artifact["manifest"]["vectorizer"]
+    if settings["kind"] == "hashing":
+        n_features = settings["n_features"]
+        hashes = np.array([_murmurhash3_32(t) for t in terms], dtype=np.int64)
+        index = np.where(hashes == -2 ** 31, (2 ** 31 - 1 - (n_features - 1)) % n_features, np.abs(hashes) % n_features)
+        value = np.where(hashes >= 0, 1.0, -1.0) if settings["alternate_sign"] else np.ones(len(terms))
+        return index, value
+
+    # The vocabulary is sorted, so lookups are a binary search
+    vocabulary = artifact["arrays"]["vocabulary"]
+    terms = np.array(terms, dtype=str)
+    index = np.searchsorted(vocabulary, terms)
+    found = index < len(vocabulary)
+    found[found] = vocabulary[index[found]] == terms[found]
+    return index[found], np.ones(int(found.sum()))
+
+
+# Sparse TF-IDF (or hashed) rows for `texts` as COO arrays (row, feature, value),
+# matching the fitted vectorizer's transform().
+def _featurize(artifact, texts):
+    settings = artifact["manifest"]["vectorizer"]
+    rows, features, values = [], [], []
+    for row, text in enumerate(texts):
+        terms = _terms(text, settings)
+        if not terms:
+            continue
+        index, value = _term_features(terms, artifact)
+        index, inverse = np.unique(index, return_inverse=True)
+        value = np.bincount(inverse.ravel(), weights=value, minlength=len(index))
+        keep = value != 0
+        index, value = index[keep], value[keep]
+        if settings["binary"]:
+            value = np.ones_like(value)
+        if settings.get("sublinear_tf"):
+            value = np.log(value) + 1
+        if settings.get("use_idf"):
+            value = value * artifact["arrays"]["idf"][index]
+        if settings["norm"] == "l2":
+            value = value / np.sqrt(np.dot(value, value)) if value.size else value
+        elif settings["norm"] == "l1":
+            value = value / np.abs(value).sum() if value.size else value
+        rows.append(np.full(len(index), row))
+        features.append(index)
+        values.append(value)
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(rows), np.concatenate(features), np.concatenate(values)
+
+
+# coef_ @ x + intercept_ for every text, reading only the coefficient rows of
+# the features each text actually has.
+def decision_scores(artifact, texts):
+    arrays = artifact["arrays"]
+    intercept = np.asarray(arrays["intercept"])
+    scores = np.tile(intercept, (len(texts), 1))
+    rows, features, values = _featurize(artifact, texts)
+    if not rows.size:
+        return scores
+
+    indptr = arrays["coef_indptr"]
+    starts, lengths = indptr[features], indptr[features + 1] - indptr[features]
+    total = int(lengths.sum())
+    if total:
+        # Positions of every (feature, class) coefficient the batch touches
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.repeat(starts, lengths) + offsets
+        np.add.at(
+            scores,
+            (np.repeat(rows, lengths), arrays["coef_indices"][positions]),
+            np.repeat(values, lengths) * arrays["coef_data"][positions],
+        )
+    return scores
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _uncalibrated_proba(scores, probability):
+    if probability == "ovr_logistic":
+        prob = 1.0 / (1.0 + np.exp(-scores))
+        if prob.shape[1] == 1:
+            return np.column_stack([1 - prob[:, 0], prob[:, 0]])
+        return prob / prob.sum(axis=1, keepdims=True)
+    if scores.shape[1] == 1:
+        # Binary classifiers have one margin per sample
+        scores = np.column_stack([-scores[:, 0], scores[:, 0]])
+    return _softmax(scores)
+
+
+# Same as CalibratedClassifierCV.predict_proba: one sigmoid per class, then
+# normalised (binary models calibrate only the positive class).
+def _calibrated_proba(scores, classifier):
+    calibration = classifier["calibration"]
+    if calibration["input"] == "proba":
+        scores = _uncalibrated_proba(scores, classifier["probability"])
+        if scores.shape[1] == 2 and len(calibration["a"]) == 1:
+            scores = scores[:, 1:]
+    prob = 1.0 / (1.0 + np.exp(np.asarray(calibration["a"]) * scores + np.asarray(calibration["b"])))
+    if prob.shape[1] == 1:
+        return np.column_stack([1 - prob[:, 0], prob[:, 0]])
+    total = prob.sum(axis=1, keepdims=True)
+    # Every calibrator saying 0 falls back to uniform, as scikit-learn does
+    return np.divide(prob, total, out=np.full_like(prob, 1 / prob.shape[1]), where=total != 0)
+
+
+# Class probabilities for a batch of texts, in the order of manifest labels.
+def predict_proba(artifact, texts):
+    scores = decision_scores(artifact, texts)
+    classifier = artifact["manifest"]["classifier"]
+    if classifier.get("calibration"):
+        return _calibrated_proba(scores, classifier)
+    return _uncalibrated_proba(scores, classifier["probability"])
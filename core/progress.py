@@ -1,14 +1,198 @@
 # core/progress.py
+import atexit
 import json
 import os
+import threading
 from datetime import datetime, timezone, timedelta
 
+from core.db import get_connection, write_transaction
+from core.tasks import TASKS_DB, get_task_difficulty
+
+
+PROGRESS_DB = "data/progress.db"
+LEGACY_PROGRESS_DB = "data/progress.json"
+
+# Attempts are buffered in memory and written in one transaction once either
+# limit is reached, so a burst of submissions costs a single disk sync.
+FLUSH_BATCH_SIZE = 20
+FLUSH_INTERVAL_SECONDS = 2.0
+
+COLUMNS = ["username", "task_id", "passed", "total", "code", "timestamp", "duration_seconds", "difficulty"]
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_flush_timer = None
+
+
+# Create the attempts table and import the old JSON array the first time the
+# database is opened.
+def _init_db(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT,
+            task_id TEXT,
+            passed INTEGER,
+            total INTEGER,
+            code TEXT,
+            timestamp TEXT,
+            duration_seconds INTEGER,
+            difficulty TEXT
+        )
+        """
+    )
+    # Per-user reads walk this index in time order and never touch other users' rows
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user_time ON attempts (username, timestamp)")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    _init_rollups(conn)
+    migrate_legacy_progress(conn)
+
+
+_SUCCESS_RATE_SQL = "CASE WHEN {t}.total > 0 THEN {t}.passed * 100.0 / {t}.total ELSE 0 END"
+
+
+# Per-user aggregates for the dashboard, kept current by a trigger on every
+# insert so reading them never scans the attempt history.
+#   user_stats         - attempt count and last attempt id (a cache revision)
+#   task_rollups       - per task: attempts, summed success rate, time spent
+#   difficulty_rollups - per difficulty: attempts, summed success rate
+def _init_rollups(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS user_stats ("
+        "username TEXT PRIMARY KEY, attempts INTEGER NOT NULL, last_id INTEGER NOT NULL)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS task_rollups ("
+        "username TEXT, task_id TEXT, difficulty TEXT, attempts INTEGER NOT NULL, "
+        "success_rate_sum REAL NOT NULL, duration_sum INTEGER NOT NULL, last_timestamp TEXT, "
+        "PRIMARY KEY (username, task_id))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS difficulty_rollups ("
+        "username TEXT, difficulty TEXT, attempts INTEGER NOT NULL, success_rate_sum REAL NOT NULL, "
+        "PRIMARY KEY (username, difficulty))"
+    )
+    rate = _SUCCESS_RATE_SQL.format(t="NEW")
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS attempts_rollup AFTER INSERT ON attempts
+        BEGIN
+            INSERT INTO user_stats (username, attempts, last_id) VALUES (NEW.username, 1, NEW.id)
+            ON CONFLICT (username) DO UPDATE SET attempts = attempts + 1, last_id = NEW.id;
+            INSERT INTO task_rollups VALUES (
+                NEW.username, NEW.task_id, NEW.difficulty, 1, {rate}, COALESCE(NEW.duration_seconds, 0), NEW.timestamp)
+            ON CONFLICT (username, task_id) DO UPDATE SET
+                difficulty = excluded.difficulty,
+                attempts = attempts + 1,
+                success_rate_sum = success_rate_sum + excluded.success_rate_sum,
+                duration_sum = duration_sum + excluded.duration_sum,
+                last_timestamp = excluded.last_timestamp;
+            INSERT INTO difficulty_rollups VALUES (NEW.username, NEW.difficulty, 1, {rate})
+            ON CONFLICT (username, difficulty) DO UPDATE SET
+                attempts = attempts + 1,
+                success_rate_sum = success_rate_sum + excluded.success_rate_sum;
+        END
+        """
+    )
+    write_transaction(conn, _backfill_rollups)
+
+
+# Databases created before the rollup tables existed get them rebuilt once.
+def _backfill_rollups(conn):
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'rollups_built'").fetchone():
+        return
+    rate = _SUCCESS_RATE_SQL.format(t="a")
+    for table in ("user_stats", "task_rollups", "difficulty_rollups"):
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute(
+        "INSERT INTO user_stats SELECT username, COUNT(*), MAX(id) FROM attempts GROUP BY username"
+    )
+    conn.execute(
+        f"""
+        INSERT INTO task_rollups
+        SELECT g.username, g.task_id, latest.difficulty, g.attempts, g.rate_sum, g.duration_sum, g.last_timestamp
+        FROM (
+            SELECT a.username, a.task_id, COUNT(*) AS attempts, SUM({rate}) AS rate_sum,
+                   SUM(COALESCE(a.duration_seconds, 0)) AS duration_sum,
+                   MAX(a.timestamp) AS last_timestamp, MAX(a.id) AS last_id
+            FROM attempts a GROUP BY a.username, a.task_id
+        ) g JOIN attempts latest ON latest.id = g.last_id
+        """
+    )
+    conn.execute(
+        f"INSERT INTO difficulty_rollups SELECT a.username, a.difficulty, COUNT(*), SUM({rate}) "
+        "FROM attempts a GROUP BY a.username, a.difficulty"
+    )
+    conn.execute("INSERT INTO meta (key, value) VALUES ('rollups_built', '1')")
+
+
+def _connect():
+    return get_connection(PROGRESS_DB, _init_db)
+
+
+def _insert_records(conn, records):
+    conn.executemany(
+        f"INSERT INTO attempts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+        [tuple(r.get(c) for c in COLUMNS) for r in records],
+    )
+
+
+# One-shot import of data/progress.json (a JSON array) into the database.
+# Runs once per database; the JSON file is left in place as a backup.
+def migrate_legacy_progress(conn, json_path=LEGACY_PROGRESS_DB):
+    if not os.path.exists(json_path):
+        return 0
+
+    def _migrate(conn):
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_migrated'").fetchone():
+            return 0
+        data = []
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+                if content:
+                    data = json.loads(content)
+        except json.JSONDecodeError:
+            print(f"⚠️ Could not decode {json_path}, skipping migration.")
+            data = []
+        _insert_records(conn, [d for d in data if isinstance(d, dict)])
+        conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', ?)", (json_path,))
+        return len(data)
+
+    migrated = write_transaction(conn, _migrate)
+    if migrated:
+        print(f"✅ Migrated {migrated} progress records from {json_path} to {PROGRESS_DB}.")
+    return migrated
+
+
+# Write every buffered attempt to disk in a single transaction.
+def flush_progress():
+    global _flush_timer
+    with _buffer_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _buffer:
+            return
+        records = list(_buffer)
+        _buffer.clear()
+
+    try:
+        write_transaction(_connect(), lambda conn: _insert_records(conn, records))
+    except Exception as e:
+        # Put them back so the next flush retries instead of dropping attempts
+        with _buffer_lock:
+            _buffer[:0] = records
+        print(f"⚠️ Failed to write progress to {PROGRESS_DB}: {e}")
+
+
+atexit.register(flush_progress)
 
-PROGRESS_DB = "data/progress.json"
-TASKS_DB = "data/coding_task.json"
 
 def log_progress(username, task_id, passed, total, code, duration):
-    # Log progress into progress.json with difficulty info.
+    # Log progress into the progress store with difficulty info.
+    global _flush_timer
     record = {
         "username": username,
         "task_id": task_id,
@@ -20,44 +204,88 @@ def log_progress(username, task_id, passed, total, code, duration):
         "difficulty": get_difficulty(task_id)
     }
 
-    os.makedirs(os.path.dirname(PROGRESS_DB), exist_ok=True)
-    data = []
-    if os.path.exists(PROGRESS_DB):
-        try:
-            with open(PROGRESS_DB, "r", encoding="utf-8") as f:
-                content = f.read().strip()
-                if content:
-                    data = json.loads(content)
-        except json.JSONDecodeError:
-            data = []
+    with _buffer_lock:
+        _buffer.append(record)
+        full = len(_buffer) >= FLUSH_BATCH_SIZE
+        if not full and _flush_timer is None:
+            _flush_timer = threading.Timer(FLUSH_INTERVAL_SECONDS, flush_progress)
+            _flush_timer.daemon = True
+            _flush_timer.start()
 
-    data.append(record)
+    if full:
+        flush_progress()
 
-    with open(PROGRESS_DB, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+# Fetch attempts, optionally for one user and only the requested columns.
+# Passing `columns` keeps large fields such as `code` out of the result, and
+# `since` (an ISO timestamp) limits the query to recent attempts, and `limit`
+# to the latest N (still returned oldest first).
+def load_progress(username=None, columns=None, since=None, limit=None):
+    # Pending attempts are flushed first so a user always sees their last run.
+    flush_progress()
+    columns = list(columns) if columns else COLUMNS
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown progress columns: {unknown}")
+
+    query = f"SELECT {', '.join(columns)} FROM attempts"
+    clauses, params = [], []
+    if username:
+        clauses.append("username = ?")
+        params.append(username)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    order = "timestamp, id" if username else "id"
+    if limit is not None:
+        # Newest first so SQLite stops after `limit` rows of the index
+        order = ", ".join(f"{key} DESC" for key in order.split(", "))
+        query += f" ORDER BY {order} LIMIT ?"
+        params.append(int(limit))
+    else:
+        query += f" ORDER BY {order}"
 
-def load_progress(username=None):
-    if not os.path.exists(PROGRESS_DB):
-        return []
     try:
-        with open(PROGRESS_DB, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if username:
-                return [d for d in data if d["username"] == username]
-            return data
-    except json.JSONDecodeError:
+        rows = _connect().execute(query, params).fetchall()
+    except Exception as e:
+        print(f"⚠️ Failed to read progress from {PROGRESS_DB}: {e}")
         return []
+    if limit is not None:
+        rows.reverse()
+    return [dict(row) for row in rows]
 
-def get_difficulty(task_id):
-    # Fetch difficulty from coding_task.json if available.
-    if not os.path.exists(TASKS_DB):
-        return "Unknown"
+# Changes whenever `username` logs an attempt; used as a cache key.
+def get_progress_revision(username):
+    flush_progress()
     try:
-        with open(TASKS_DB, "r", encoding="utf-8") as f:
-            tasks = json.load(f)
-            for t in tasks:
-                if t.get("id") == task_id:
-                    return t.get("difficulty", "Unknown")
-    except Exception:
-        pass
-    return "Unknown"
\ No newline at end of file
+        row = _connect().execute("SELECT last_id FROM user_stats WHERE username = ?", (username,)).fetchone()
+    except Exception as e:
+        print(f"⚠️ Failed to read progress from {PROGRESS_DB}: {e}")
+        return None
+    return row["last_id"] if row else 0
+
+
+def load_task_rollups(username):
+    flush_progress()
+    rows = _connect().execute(
+        "SELECT task_id, difficulty, attempts, success_rate_sum / attempts AS success_rate, "
+        "duration_sum, last_timestamp FROM task_rollups WHERE username = ? ORDER BY task_id",
+        (username,),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def load_difficulty_rollups(username):
+    flush_progress()
+    rows = _connect().execute(
+        "SELECT difficulty, attempts, success_rate_sum / attempts AS success_rate "
+        "FROM difficulty_rollups WHERE username = ? ORDER BY difficulty",
+        (username,),
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_difficulty(task_id):
+    # Fetch difficulty from the cached task catalogue if available.
+    return get_task_difficulty(task_id, TASKS_DB)
@@ -0,0 +1,97 @@
+import math
+import re
+
+# Builds the "Simplify This Error" prompts within a fixed token budget.
+# Earlier explanations are included newest first, with their code blocks
+# removed (the student's code is already in the prompt once) and each one cut
+# to a short excerpt, until the budget runs out. Tokens are estimated at ~4
+# characters each, which is close enough to watch payload growth.
+PROMPT_TOKEN_BUDGET = 1500
+CHARS_PER_TOKEN = 4
+MAX_CODE_TOKENS = 800
+MAX_PREVIOUS_TOKENS_EACH = 150
+MAX_PREVIOUS_EXPLANATIONS = 4
+
+_CODE_BLOCK_RE = re.compile(r"```.*?(```|$)", re.DOTALL)
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+# Cut `text` to about `max_tokens`, on a word boundary where possible.
+def truncate_to_tokens(text, max_tokens):
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip() + " …"
+
+
+# Keep the start and end of long code; errors usually point at one of them.
+def _truncate_code(code, max_tokens):
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(code) <= max_chars:
+        return code
+    half = max_chars // 2
+    return code[:half].rstrip() + "\n# ... code omitted ...\n" + code[-half:].lstrip()
+
+
+def _condense(explanation):
+    text = _CODE_BLOCK_RE.sub("[code omitted]", explanation)
+    return " ".join(text.split())
+
+
+def _base_prompt(code, error_message, previous_block, previous_count=0):
+    if previous_count:
+        return (
+            f"A beginner is still confused about an error in their Python code. "
+            f"Here is their code:\n\n```python\n{code}\n```\n\n"
+            f"The error is:\n`{error_message}`\n\n"
+            f"You already provided {previous_count} explanation(s). The most recent ones, shortened:\n{previous_block}\n\n"
+            f"Please provide another explanation, but use a completely different analogy or a simpler perspective. Be very encouraging."
+        )
+    return (
+        f"Explain this Python error in very simple, beginner-friendly terms. "
+        f"The error is:\n`{error_message}`\n\n"
+        f"The user wrote this code:\n\n```python\n{code}\n```\n\n"
+        f"Tell them what's wrong and how to fix it in their specific code."
+    )
+
+
+# Returns (prompt, stats). stats has the estimated "tokens" and "chars" of the
+# prompt and how many of the earlier explanations made it in.
+def build_simplify_error_prompt(user_code, error_message, previous_explanations=(), budget=PROMPT_TOKEN_BUDGET):
+    code = _truncate_code(user_code or "", MAX_CODE_TOKENS)
+    error_message = truncate_to_tokens(str(error_message), 100)
+
+    previous = [p for p in previous_explanations if p and not p.startswith("⚠️")]
+    remaining = budget - estimate_tokens(_base_prompt(code, error_message, "", len(previous)))
+
+    chosen, seen = [], set()
+    for explanation in reversed(previous):
+        if len(chosen) >= MAX_PREVIOUS_EXPLANATIONS:
+            break
+        excerpt = truncate_to_tokens(_condense(explanation), MAX_PREVIOUS_TOKENS_EACH)
+        if excerpt in seen:
+            continue
+        cost = estimate_tokens(excerpt) + 2
+        if cost > remaining:
+            break
+        seen.add(excerpt)
+        chosen.append(excerpt)
+        remaining -= cost
+
+    previous_block = "\n---\n".join(reversed(chosen))
+    prompt = _base_prompt(code, error_message, previous_block or "(omitted to keep this short)", len(previous))
+    stats = {
+        "tokens": estimate_tokens(prompt),
+        "chars": len(prompt),
+        "previous_used": len(chosen),
+        "previous_total": len(previous),
+        "code_truncated": code != (user_code or ""),
+    }
+    return prompt, stats
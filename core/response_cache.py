@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+import time
+
+from core.db import get_connection, write_transaction
+
+# Persistent read-through cache for AI responses, keyed on the normalized
+# prompt. Entries expire after a TTL and the least recently used ones are
+# evicted once the cache grows past MAX_ENTRIES. Identical prompts that are
+# requested at the same time share one outbound call.
+CACHE_DB = os.getenv("AI_CACHE_DB", "data/ai_cache.db")
+TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "5000"))
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _init_db(conn):
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+
+
+def _connect():
+    return get_connection(CACHE_DB, _init_db)
+
+
+# Trailing spaces and blank lines don't change what the model is asked.
+# Indentation and case are kept because prompts carry student code.
+def normalize_prompt(prompt):
+    lines = [line.rstrip() for line in str(prompt).strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(prompt, namespace=""):
+    return hashlib.sha256(f"{namespace}\0{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+def get_cached(key, ttl=TTL_SECONDS):
+    try:
+        conn = _connect()
+        row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if time.time() - row["created_at"] > ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row["response"]
+    except Exception as e:
+        print(f"⚠️ Could not read AI response cache: {e}")
+        return None
+
+
+def put_cached(key, response, max_entries=MAX_ENTRIES):
+    now = time.time()
+
+    def _put(conn):
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, response, now, now),
+        )
+        # Evict the least recently used entries beyond the size limit
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+
+    try:
+        write_transaction(_connect(), _put)
+    except Exception as e:
+        print(f"⚠️ Could not write AI response cache: {e}")
+
+
+# Return the cached response for `prompt`, or call `fetch()` once to get it.
+# Concurrent callers with the same key wait for the first caller's result.
+# Responses rejected by `should_cache` (e.g. error messages) are returned
+# but not stored.
+def cached_call(prompt, fetch, namespace="", ttl=TTL_SECONDS, should_cache=None):
+    key = cache_key(prompt, namespace)
+    cached = get_cached(key, ttl)
+    if cached is not None:
+        return cached
+
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = {"done": threading.Event(), "result": None, "error": None}
+
+    if not leader:
+        call["done"].wait()
+        if call["error"] is not None:
+            raise call["error"]
+        return call["result"]
+
+    try:
+        result = fetch()
+        call["result"] = result
+        if should_cache is None or should_cache(result):
+            put_cached(key, result)
+        return result
+    except BaseException as e:
+        call["error"] = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        call["done"].set()
+
+
+def clear_cache():
+    write_transaction(_connect(), lambda conn: conn.execute("DELETE FROM responses"))
@@ -0,0 +1,337 @@
+import builtins
+import marshal
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import traceback
+from io import StringIO
+from multiprocessing.connection import Connection
+
+from core.compile_cache import get_code
+from core.error_record import build_error_record, make_error_record
+
+try:
+    import resource  # POSIX only; limits are skipped where it is unavailable
+except ImportError:
+    resource = None
+
+# Student code runs in a pool of warm worker processes instead of the
+# Streamlit server thread. Each job gets its own stdout buffer and input(),
+# a CPU-time rlimit, and a wall-clock timeout enforced by the parent.
+# A worker is a template: it stays up across requests and forks a child for
+# every job, so anything the code did to modules, sys.path or the cwd dies
+# with the child while the next job still starts from a warm interpreter.
+POOL_SIZE = int(os.getenv("SANDBOX_WORKERS", min(4, os.cpu_count() or 1)))
+DEFAULT_TIMEOUT_SECONDS = 5
+DEFAULT_CPU_SECONDS = 5
+MEMORY_LIMIT_MB = int(os.getenv("SANDBOX_MEMORY_MB", "512"))
+MAX_OUTPUT_CHARS = 100_000
+
+_idle = queue.Queue()
+_pool_lock = threading.Lock()
+_started = False
+
+
+def make_input_fn(input_str):
+    if input_str is None:
+        parts = []
+    elif "\n" in input_str:
+        parts = [p for p in input_str.splitlines()]
+    else:
+        parts = [p for p in input_str.split()] if input_str.strip() else []
+    it = iter(parts)
+
+    def _input(prompt=""):
+        try:
+            return next(it)
+        except StopIteration:
+            # If code tries to read more input than provided, raise EOFError similar to real input
+            raise EOFError("No more input provided for this test case.")
+    return _input
+
+
+def _failure(message, exc_type, timed_out=False):
+    return {"ok": False, "stdout": "", "error": message, "exc_type": exc_type, "traceback": None,
+            "error_record": make_error_record(exc_type, message), "timed_out": timed_out}
+
+
+def _error_result(e, source, traceback_text):
+    return {"ok": False, "stdout": "", "error": str(e), "exc_type": type(e).__name__, "traceback": traceback_text,
+            "error_record": build_error_record(e, source), "timed_out": False}
+
+
+# Worker side
+
+def _set_memory_limit(memory_mb):
+    if resource is None or not memory_mb:
+        return
+    limit = memory_mb * 1024 * 1024
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError):
+        pass
+
+
+# Set in the forked child, whose CPU clock starts from zero. Going over the
+# limit raises SIGXCPU, which kills the child; the template then reports the
+# job as stopped.
+def _set_cpu_limit(cpu_seconds):
+    if resource is None or not cpu_seconds:
+        return
+    soft = int(cpu_seconds)
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError):
+        pass
+
+
+def _run_job(job):
+    _set_cpu_limit(job.get("cpu_seconds"))
+
+    stdout = StringIO()
+    old_stdout, old_input = sys.stdout, builtins.input
+    sys.stdout = stdout
+    builtins.input = make_input_fn(job.get("stdin"))
+
+    result = {"ok": True, "stdout": "", "error": None, "exc_type": None, "traceback": None, "error_record": None, "timed_out": False}
+    try:
+        # Compiled once in the parent, so test cases don't each recompile it
+        exec(marshal.loads(job["code"]), {"__name__": "__main__"})
+    except BaseException as e:
+        if isinstance(e, SyntaxError):
+            # Raised by exec()/eval() inside the code; only the caret is useful
+            traceback_text = "".join(traceback.format_exception_only(type(e), e))
+        else:
+            # Drop this frame so the traceback starts in the student's code
+            traceback_text = "".join(traceback.format_exception(type(e), e, e.__traceback__.tb_next))
+        result = _error_result(e, job["source"], traceback_text)
+    finally:
+        sys.stdout, builtins.input = old_stdout, old_input
+
+    output = stdout.getvalue()
+    if len(output) > MAX_OUTPUT_CHARS:
+        output = output[:MAX_OUTPUT_CHARS] + "\n... output truncated ..."
+    result["stdout"] = output
+    return result
+
+
+# Run one job in a forked child and return its pickled result, or None if the
+# child died without answering (e.g. killed by SIGXCPU). The child answers on
+# a pipe of its own, so a dead child can't be mistaken for a quiet one.
+def _fork_job(job, jobs, results):
+    child_r, child_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            # Keep the code off the template's pipes
+            os.close(child_r)
+            jobs.close()
+            results.close()
+            try:
+                result = _run_job(job)
+            except BaseException as e:
+                result = _failure(f"Sandbox failure: {e}", type(e).__name__)
+            Connection(child_w, readable=False).send(result)
+            status = 0
+        finally:
+            os._exit(status)
+
+    os.close(child_w)
+    with Connection(child_r, writable=False) as child:
+        try:
+            payload = child.recv_bytes()
+        except EOFError:
+            payload = None
+    os.waitpid(pid, 0)
+    return payload
+
+
+# Say ready, then fork a child for each job until told to stop.
+def _worker_main(jobs, results, memory_mb):
+    _set_memory_limit(memory_mb)
+    results.send("ready")
+    while True:
+        try:
+            job = jobs.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        payload = _fork_job(job, jobs, results)
+        if payload is None:
+            results.send(_failure("Execution was stopped because it exceeded the CPU or memory limit.", "ResourceLimitError"))
+        else:
+            results.send_bytes(payload)
+
+
+# Parent side
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Student code must not see the server's secrets (GEMINI_API_KEY and the
+# like), so workers only get what the interpreter needs.
+def _worker_env():
+    return {key: value for key, value in os.environ.items()
+            if key in ("PATH", "PYTHONPATH", "LANG") or key.startswith("LC_")}
+
+
+# Workers are fresh `python -m core.sandbox` processes talking over two pipes.
+# Unlike multiprocessing's spawn/forkserver they never re-import the app's
+# __main__, and nothing is forked from the threaded Streamlit server. Each
+# leads its own session so a timed-out job can be killed along with its child.
+def _spawn_worker():
+    job_r, job_w = os.pipe()
+    result_r, result_w = os.pipe()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "core.sandbox", str(job_r), str(result_w), str(MEMORY_LIMIT_MB)],
+        cwd=_ROOT,
+        env=_worker_env(),
+        pass_fds=(job_r, result_w),
+        stdin=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    os.close(job_r)
+    os.close(result_w)
+    return {"process": process, "conn": Connection(job_w, readable=False), "results": Connection(result_r, writable=False), "ready": False}
+
+
+# Consume the worker's startup message. Returns False if it didn't start in time.
+def _wait_ready(worker, timeout=DEFAULT_TIMEOUT_SECONDS):
+    if not worker["ready"]:
+        try:
+            worker["ready"] = worker["results"].poll(timeout) and worker["results"].recv() == "ready"
+        except (EOFError, OSError):
+            return False
+    return worker["ready"]
+
+
+def _kill_worker(worker):
+    for conn in (worker["conn"], worker["results"]):
+        try:
+            conn.close()
+        except OSError:
+            pass
+    if worker["process"].poll() is None:
+        try:
+            os.killpg(worker["process"].pid, signal.SIGKILL)
+        except OSError:
+            worker["process"].kill()
+    try:
+        worker["process"].wait(timeout=1)
+    except subprocess.TimeoutExpired:
+        pass
+
+
+# Start the workers up front so the first submission doesn't pay for it.
+def start_pool(size=POOL_SIZE):
+    global _started
+    with _pool_lock:
+        if _started:
+            return
+        for _ in range(size):
+            _idle.put(_spawn_worker())
+        _started = True
+
+
+# A healthy worker goes straight back into the pool (unless it was shut down
+# meanwhile).
+def _release_worker(worker):
+    with _pool_lock:
+        if _started:
+            _idle.put(worker)
+            return
+    _kill_worker(worker)
+
+
+# Kill a broken or timed-out worker and put a fresh one in the pool, off the
+# request path.
+def _replace_worker(worker):
+    _kill_worker(worker)
+    fresh = _spawn_worker()
+    with _pool_lock:
+        if _started:
+            _idle.put(fresh)
+            return
+    _kill_worker(fresh)
+
+
+# Block until every idle worker has finished starting up (for benchmarks and
+# warm-up; run_code doesn't need it).
+def wait_for_pool(timeout=DEFAULT_TIMEOUT_SECONDS):
+    workers = []
+    while True:
+        try:
+            workers.append(_idle.get_nowait())
+        except queue.Empty:
+            break
+    for worker in workers:
+        _wait_ready(worker, timeout)
+        _idle.put(worker)
+    return len(workers)
+
+
+def shutdown_pool():
+    global _started
+    with _pool_lock:
+        while True:
+            try:
+                worker = _idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker["conn"].send(None)
+            except OSError:
+                pass
+            _kill_worker(worker)
+        _started = False
+
+
+# Run `code` in a pooled worker with `stdin` fed to input().
+# Returns a dict: ok, stdout, error (str(e)), exc_type, traceback,
+# error_record (see core/error_record.py), timed_out.
+def run_code(code, stdin="", timeout=DEFAULT_TIMEOUT_SECONDS, cpu_seconds=DEFAULT_CPU_SECONDS):
+    try:
+        # Cached per source, so every test case of a submission shares one compile
+        code_bytes = marshal.dumps(get_code(code))
+    except (SyntaxError, ValueError) as e:
+        # The code can't run at all, so only the error and its caret are useful
+        return _error_result(e, code, "".join(traceback.format_exception_only(type(e), e)))
+
+    start_pool()
+    worker = _idle.get()  # waits while every worker is busy
+    healthy = False
+    try:
+        if not _wait_ready(worker):
+            result = _failure("The sandbox could not start a worker to run this code.", "SandboxError")
+        else:
+            worker["conn"].send({"code": code_bytes, "source": code, "stdin": stdin, "cpu_seconds": cpu_seconds})
+            if worker["results"].poll(timeout):
+                result = worker["results"].recv()
+                healthy = True
+            else:
+                result = _failure(f"Execution timed out after {timeout} seconds.", "TimeoutError", timed_out=True)
+    except (EOFError, OSError):
+        # Limits are enforced on the forked child, so this is the template itself
+        result = _failure("The sandbox worker stopped unexpectedly.", "SandboxError")
+
+    if healthy:
+        _release_worker(worker)
+    else:
+        # The job may still be running, so the worker can't be reused
+        threading.Thread(target=_replace_worker, args=(worker,), daemon=True).start()
+    return result
+
+
+if __name__ == "__main__":
+    _worker_main(Connection(int(sys.argv[1]), writable=False), Connection(int(sys.argv[2]), readable=False), int(sys.argv[3]))
@@ -0,0 +1,56 @@
+import json
+
+from core.file_cache import load_cached
+
+TASKS_DB = "data/coding_task.json"
+
+
+# Parse the task file into a list (in file order) plus an id -> task dict.
+# Returned objects are shared between sessions, so callers must not mutate them.
+def build_catalogue(path):
+    catalogue = {"tasks": [], "by_id": {}, "error": None}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+    except OSError:
+        return catalogue
+    if not content:
+        return catalogue
+
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as e:
+        catalogue["error"] = f"Failed to load tasks JSON: {e}"
+        return catalogue
+
+    # if someone saved as dict, attempt to convert to list
+    if isinstance(data, dict):
+        data = list(data.values())
+    if not isinstance(data, list):
+        return catalogue
+
+    catalogue["tasks"] = data
+    for task in data:
+        if isinstance(task, dict) and "id" in task:
+            catalogue["by_id"].setdefault(task["id"], task)
+    return catalogue
+
+
+# Loaded once per process and re-read only when the file's mtime changes.
+def load_catalogue(path=TASKS_DB):
+    return load_cached(path, build_catalogue)
+
+
+def load_tasks(path=TASKS_DB):
+    return load_catalogue(path)["tasks"]
+
+
+def get_task(task_id, path=TASKS_DB):
+    return load_catalogue(path)["by_id"].get(task_id)
+
+
+def get_task_difficulty(task_id, path=TASKS_DB):
+    task = get_task(task_id, path)
+    if task is None:
+        return "Unknown"
+    return task.get("difficulty", "Unknown")
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+# Keeps chart payloads a fixed size however long a user's history gets or
+# however many tasks it covers: keep the busiest traces and merge the rest
+# into "Other", bucket attempts by day/week, then thin each trace with
+# Largest-Triangle-Three-Buckets, which keeps the points that shape the line
+# (peaks, dips).
+DEFAULT_POINT_BUDGET = 400
+DEFAULT_MAX_TRACES = 10
+OTHER_TRACE = "Other"
+
+
+# Indices of the `threshold` points LTTB keeps from (x, y); always includes
+# the first and last point. x must be sorted ascending.
+def lttb_indices(x, y, threshold):
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        # Too few points for triangles; keep the ends
+        return np.linspace(0, n - 1, max(threshold, 0)).round().astype(int)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+
+    # Interior points are split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket (or the last point) is the third vertex
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+
+        ax, ay = x[selected], y[selected]
+        bx, by = x[start:end], y[start:end]
+        areas = np.abs((ax - avg_x) * (by - ay) - (ax - bx) * (avg_y - ay))
+        selected = start + int(areas.argmax())
+        keep[i + 1] = selected
+    return keep
+
+
+# Keep the `max_traces` traces with the most rows and relabel the rest as
+# OTHER_TRACE, so the number of lines (and the budget split) stays bounded.
+# Run it on raw attempts, before bucket_series, so "Other" is averaged as one.
+def limit_traces(df, trace, max_traces=DEFAULT_MAX_TRACES):
+    if df.empty:
+        return df
+    counts = df[trace].value_counts()
+    if len(counts) <= max_traces:
+        return df
+    # One slot goes to "Other" itself
+    keep = counts.index[:max(max_traces - 1, 0)]
+    df = df.copy()
+    df[trace] = df[trace].where(df[trace].isin(keep), OTHER_TRACE)
+    return df
+
+
+# Downsample every trace of a long-format frame (one row per point) so the
+# whole figure holds at most `budget` points. Traces shorter than their share
+# keep every point and leave the rest of their share to the longer ones.
+def downsample_traces(df, x, y, trace, budget=DEFAULT_POINT_BUDGET):
+    if df.empty:
+        return df
+    groups = sorted((group for _, group in df.groupby(trace, sort=False)), key=len)
+    remaining = budget
+    parts = []
+    for i, group in enumerate(groups):
+        share = min(len(group), remaining // (len(groups) - i))
+        remaining -= share
+        group = group.sort_values(x)
+        xs = group[x]
+        # Datetimes (tz-aware or not) are compared as epoch nanoseconds
+        xs = xs.astype("int64").to_numpy() if pd.api.types.is_datetime64_any_dtype(xs) else xs.to_numpy()
+        parts.append(group.iloc[lttb_indices(xs, group[y].to_numpy(), share)])
+    return pd.concat(parts, ignore_index=True)
+
+
+# Average `value` per `freq` period ("D" for day, "W" for week) for each trace.
+def bucket_series(df, time_col, value, trace, freq):
+    if df.empty:
+        return df
+    bucketed = (
+        df.groupby([pd.Grouper(key=time_col, freq=freq), trace])[value]
+        .agg(["mean", "count"])
+        .reset_index()
+        .rename(columns={"mean": value, "count": "attempts"})
+    )
+    return bucketed[bucketed["attempts"] > 0]
@@ -0,0 +1,193 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from core.db import get_connection, write_transaction
+
+# Accounts live in SQLite keyed by username, so a login is one primary-key
+# lookup however many accounts exist, and a signup is one INSERT that can't
+# overwrite a concurrent one. Passwords are stored as salted PBKDF2-SHA256
+# hashes ("pbkdf2_sha256$<iterations>$<salt>$<hash>"). The cost is tunable;
+# hashes made with an older cost are upgraded on the next successful login.
+# Time it with scripts/bench_password_hash.py.
+USER_DB = "db/users.db"
+LEGACY_USER_DB = "db/users.json"
+HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+SALT_BYTES = 16
+
+# Recent successful logins are remembered for a while so a user logging in
+# again doesn't pay for the full hash. Entries hold a keyed digest of the
+# password, never the password, and are dropped when the stored hash changes.
+VERIFY_CACHE_SIZE = 1024
+VERIFY_CACHE_TTL_SECONDS = 15 * 60
+
+_verify_cache = OrderedDict()  # username -> (stored hash, password digest, expires)
+_verify_lock = threading.Lock()
+_cache_secret = secrets.token_bytes(32)
+
+
+def hash_password(password, iterations=None, salt=None):
+    iterations = iterations or HASH_ITERATIONS
+    salt = salt or secrets.token_bytes(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${salt.hex()}${digest.hex()}"
+
+
+def _check_hash(password, stored):
+    try:
+        algorithm, iterations, salt, expected = stored.split("$")
+        if algorithm != "pbkdf2_sha256":
+            return False
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), bytes.fromhex(salt), int(iterations))
+    except (ValueError, AttributeError):
+        return False
+    return hmac.compare_digest(digest.hex(), expected)
+
+
+def _hash_iterations(stored):
+    try:
+        return int(stored.split("$")[1])
+    except (IndexError, ValueError, AttributeError):
+        return 0
+
+
+def _init_db(conn):
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS users ("
+        "username TEXT PRIMARY KEY, password_hash TEXT NOT NULL, created_at REAL NOT NULL)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    migrate_legacy_users(conn)
+
+
+def _connect():
+    return get_connection(USER_DB, _init_db)
+
+
+# One-shot import of db/users.json ({username: {"password": plain text}}).
+# Passwords are hashed on the way in; the JSON file is emptied afterwards so
+# plain-text passwords don't stay on disk.
+def migrate_legacy_users(conn, json_path=None):
+    json_path = json_path or LEGACY_USER_DB
+    if not os.path.exists(json_path):
+        return 0
+
+    def _migrate(conn):
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_migrated'").fetchone():
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+                data = json.loads(content) if content else {}
+        except json.JSONDecodeError:
+            print(f"⚠️ Could not decode {json_path}, skipping migration.")
+            data = {}
+        now = time.time()
+        rows = [
+            (username, hash_password(str(record["password"])), now)
+            for username, record in data.items()
+            if isinstance(record, dict) and record.get("password")
+        ]
+        conn.executemany("INSERT OR IGNORE INTO users (username, password_hash, created_at) VALUES (?, ?, ?)", rows)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', ?)", (json_path,))
+        return len(rows)
+
+    migrated = write_transaction(conn, _migrate)
+    if migrated:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({}, f)
+        print(f"✅ Migrated {migrated} accounts from {json_path} to {USER_DB} with hashed passwords.")
+    return migrated
+
+
+def user_exists(username):
+    return _connect().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+
+# Returns False if the username is already taken.
+def create_user(username, password, iterations=None):
+    password_hash = hash_password(password, iterations)
+    try:
+        write_transaction(
+            _connect(),
+            lambda conn: conn.execute(
+                "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                (username, password_hash, time.time()),
+            ),
+        )
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+
+def _cache_digest(password):
+    return hmac.new(_cache_secret, password.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _cached_verification(username, stored, password):
+    with _verify_lock:
+        entry = _verify_cache.get(username)
+        if entry is None:
+            return False
+        cached_hash, digest, expires = entry
+        if cached_hash != stored or expires < time.monotonic():
+            del _verify_cache[username]
+            return False
+        _verify_cache.move_to_end(username)
+    return hmac.compare_digest(digest, _cache_digest(password))
+
+
+def _remember_verification(username, stored, password):
+    with _verify_lock:
+        _verify_cache[username] = (stored, _cache_digest(password), time.monotonic() + VERIFY_CACHE_TTL_SECONDS)
+        _verify_cache.move_to_end(username)
+        while len(_verify_cache) > VERIFY_CACHE_SIZE:
+            _verify_cache.popitem(last=False)
+
+
+def _upgrade_hash(username, stored, password):
+    new_hash = hash_password(password)
+    write_transaction(
+        _connect(),
+        lambda conn: conn.execute(
+            "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+            (new_hash, username, stored),
+        ),
+    )
+    return new_hash
+
+
+def verify_user(username, password):
+    if not username or not password:
+        return False
+    row = _connect().execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+    if row is None:
+        # Spend the same time as a wrong password so misses don't reveal
+        # which usernames exist
+        hash_password(password)
+        return False
+
+    stored = row["password_hash"]
+    if _cached_verification(username, stored, password):
+        return True
+    if not _check_hash(password, stored):
+        return False
+
+    if _hash_iterations(stored) != HASH_ITERATIONS:
+        try:
+            stored = _upgrade_hash(username, stored, password)
+        except Exception as e:
+            print(f"⚠️ Could not upgrade password hash for {username}: {e}")
+    _remember_verification(username, stored, password)
+    return True
+
+
+def clear_verification_cache():
+    with _verify_lock:
+        _verify_cache.clear()
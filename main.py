@@ -1,9 +1,5 @@
 import streamlit as st
 from app import login as login_module
-from app import coding as coding_module
-from app import exercises as exercises_module
-from app import dashboard as dashboard_module
-from app import concepts as concepts_module
 
 # Temporary "database" for demo
 users_db = {}  # Stores {username: password}
@@ -34,13 +30,21 @@ def main():
             ["Dashboard", "Concepts", "Coding Practice", "Exercises", "Logout"]
         )
 
+        # Page modules (and the pandas / plotly stacks behind them) are imported
+        # the first time a page is opened, not while the login screen loads.
+        # Later imports are a sys.modules lookup, and Streamlit still reloads
+        # a page file when it is edited.
         if choice == "Coding Practice":
+            from app import coding as coding_module
             coding_module.coding_practice(st.session_state.user)
         elif choice == "Exercises":
+            from app import exercises as exercises_module
             exercises_module.exercises(st.session_state.user)
         elif choice == "Dashboard":
+            from app import dashboard as dashboard_module
             dashboard_module.dashboard(st.session_state.user)
         elif choice == "Concepts":
+            from app import concepts as concepts_module
             concepts_module.concepts(st.session_state.user)
         elif choice == "Logout":
             st.session_state.logged_in = False
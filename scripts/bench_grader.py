@@ -0,0 +1,40 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.grader import grade
+from core.sandbox import POOL_SIZE, shutdown_pool, start_pool, wait_for_pool
+
+# Compare serial and parallel grading of one submission, outside Streamlit.
+# Example: python scripts/bench_grader.py --cases 32 --sleep 0.1
+
+SOLUTION = "import time\nword = input()\ntime.sleep({sleep})\nprint(word[::-1])\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the grading engine.")
+    parser.add_argument("--cases", type=int, default=16, help="number of test cases")
+    parser.add_argument("--sleep", type=float, default=0.05, help="seconds each case spends running")
+    parser.add_argument("--workers", type=int, default=POOL_SIZE, help="parallel cases for the concurrent run")
+    args = parser.parse_args()
+
+    code = SOLUTION.format(sleep=args.sleep)
+    test_cases = [{"input": f"word{i}", "expected_output": f"word{i}"[::-1]} for i in range(args.cases)]
+
+    start = time.perf_counter()
+    start_pool(max(args.workers, 1))
+    # Until every worker has reported ready, Popen has returned but Python is still starting
+    workers = wait_for_pool()
+    print(f"Pool warm-up: {workers} workers ready in {time.perf_counter() - start:.3f}s")
+
+    for label, workers in (("serial", 1), ("parallel", args.workers)):
+        summary = grade(code, test_cases, max_workers=workers)
+        print(f"{label:>8}: {summary['passed']}/{summary['total']} passed in {summary['seconds']:.3f}s")
+
+    shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core import users
+
+# Time password hashing at a few costs, then logins against a large store.
+# Pick PASSWORD_HASH_ITERATIONS so one hash takes roughly 100-300 ms here.
+# Example: python scripts/bench_password_hash.py --accounts 20000
+
+
+def time_hash(iterations, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        users.hash_password("correct horse battery staple", iterations)
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password hashing and login lookups.")
+    parser.add_argument("--iterations", type=int, nargs="+", default=[100_000, 300_000, users.HASH_ITERATIONS])
+    parser.add_argument("--repeats", type=int, default=3, help="hashes timed per cost")
+    parser.add_argument("--accounts", type=int, default=10_000, help="accounts in the lookup benchmark")
+    parser.add_argument("--logins", type=int, default=20, help="logins timed against the store")
+    args = parser.parse_args()
+
+    print("Hash cost:")
+    for iterations in args.iterations:
+        print(f"  {iterations:>9} iterations: {time_hash(iterations, args.repeats) * 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        users.USER_DB = os.path.join(tmp, "users.db")
+        users.LEGACY_USER_DB = os.path.join(tmp, "users.json")
+
+        # The lookup cost is what's measured here, so the filler accounts
+        # share one cheap precomputed hash
+        filler = users.hash_password("filler", iterations=1)
+        start = time.perf_counter()
+        users.write_transaction(
+            users._connect(),
+            lambda conn: conn.executemany(
+                "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                ((f"user{i}", filler, 0.0) for i in range(args.accounts)),
+            ),
+        )
+        print(f"\nStored {args.accounts} accounts in {time.perf_counter() - start:.2f}s")
+
+        users.create_user("bench", "secret")
+        timings = {}
+        for label, password in (("correct password", "secret"), ("wrong password", "nope")):
+            start = time.perf_counter()
+            for _ in range(args.logins):
+                users.clear_verification_cache()
+                users.verify_user("bench", password)
+            timings[label] = (time.perf_counter() - start) / args.logins
+
+        users.verify_user("bench", "secret")
+        start = time.perf_counter()
+        for _ in range(args.logins):
+            users.verify_user("bench", "secret")
+        timings["cached login"] = (time.perf_counter() - start) / args.logins
+
+        start = time.perf_counter()
+        for i in range(args.logins):
+            users.verify_user(f"missing{i}", "secret")
+        timings["unknown user"] = (time.perf_counter() - start) / args.logins
+
+        for label, seconds in timings.items():
+            print(f"  {label:>16}: {seconds * 1000:8.2f} ms per login")
+
+
+if __name__ == "__main__":
+    main()
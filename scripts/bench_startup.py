@@ -0,0 +1,55 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Measure cold start of the app in fresh interpreters:
+#   import  - time to import main.py and which heavy packages it pulled in
+#   render  - time from a cold process to the first full render of the login
+#             screen, using Streamlit's headless AppTest runner
+# Example: python scripts/bench_startup.py --runs 5
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "plotly", "sklearn", "numpy", "requests"]
+
+IMPORT_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+RENDER_PROBE = """
+import json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("main.py", default_timeout=60).run()
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "exceptions": len(at.exception)}))
+"""
+
+
+def _probe(code):
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold start to first render.")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    for label, code in (("import main", IMPORT_PROBE), ("first render", RENDER_PROBE)):
+        results = [_probe(code) for _ in range(args.runs)]
+        times = sorted(r["seconds"] for r in results)
+        print(f"{label:>12}: median {times[len(times) // 2]:.3f}s  min {times[0]:.3f}s  max {times[-1]:.3f}s")
+        extra = {k: v for k, v in results[-1].items() if k != "seconds"}
+        if extra:
+            print(f"{'':>12}  {extra}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.model_artifact import ARTIFACT_PATH, decision_scores, export_artifact, load_artifact, predict_proba
+
+# Check that the NumPy predictor in core/model_artifact.py gives the same
+# answers as scikit-learn over data/error_training_data.json.
+#   1. The shipped artifact: scores against the same arrays run through
+#      scikit-learn's own TfidfVectorizer / HashingVectorizer.
+#   2. Pipelines of every supported kind trained here: predictions and
+#      probabilities against the pipeline itself.
+# Exits with status 1 on any mismatch.
+# Example: python scripts/check_model_parity.py
+
+EXTRA_TEXTS = [
+    "",
+    "   ",
+    "KeyError: 'name'",
+    "NameError: name 'ÜberVariable' is not defined",
+    "IndexError: list index out of range " * 20,
+    "a_very_long_identifier_that_is_not_in_any_vocabulary_at_all is not defined",
+]
+
+
+def _sklearn_scores(artifact, texts):
+    from scipy.sparse import csr_matrix
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, CountVectorizer
+
+    settings = dict(artifact["manifest"]["vectorizer"])
+    kind = settings.pop("kind")
+    settings["ngram_range"] = tuple(settings["ngram_range"])
+    arrays = artifact["arrays"]
+    if kind == "hashing":
+        features = HashingVectorizer(**settings).transform(texts)
+    else:
+        use_idf, sublinear_tf, norm = settings.pop("use_idf"), settings.pop("sublinear_tf"), settings.pop("norm")
+        vocabulary = {str(t): i for i, t in enumerate(arrays["vocabulary"])}
+        counts = CountVectorizer(vocabulary=vocabulary, **settings).transform(texts)
+        transformer = TfidfTransformer(norm=norm, use_idf=use_idf, sublinear_tf=sublinear_tf)
+        if use_idf:
+            transformer.idf_ = np.asarray(arrays["idf"])
+        features = (transformer if use_idf else transformer.fit(counts)).transform(counts)
+
+    coef = csr_matrix(
+        (arrays["coef_data"], arrays["coef_indices"], arrays["coef_indptr"]),
+        shape=(artifact["manifest"]["n_features"], len(arrays["intercept"])),
+    )
+    return (features @ coef).toarray() + np.asarray(arrays["intercept"])
+
+
+def _report(name, ok, detail):
+    print(f"{'✅' if ok else '⚠️'} {name}: {detail}")
+    return ok
+
+
+def check_artifact(path, texts):
+    artifact = load_artifact(path)
+    ours, theirs = decision_scores(artifact, texts), _sklearn_scores(artifact, texts)
+    diff = float(np.abs(ours - theirs).max())
+    same = bool((ours.argmax(axis=1) == theirs.argmax(axis=1)).all())
+    return _report(f"artifact {path}", same and diff < 1e-9, f"max score difference {diff:.2e}, same predictions: {same}")
+
+
+def _training_pipelines():
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.naive_bayes import MultinomialNB
+    from sklearn.pipeline import Pipeline
+    from sklearn.svm import LinearSVC
+
+    return {
+        "tfidf + MultinomialNB": Pipeline([("tfidf", TfidfVectorizer()), ("clf", MultinomialNB())]),
+        "tfidf(1,2) sublinear + LinearSVC": Pipeline([
+            ("tfidf", TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=2)), ("clf", LinearSVC())]),
+        "tfidf + LogisticRegression": Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression(max_iter=1000))]),
+        "hashing + SGD log_loss": Pipeline([
+            ("hashing", HashingVectorizer(n_features=2 ** 18, ngram_range=(1, 2), alternate_sign=False)),
+            ("clf", SGDClassifier(loss="log_loss", random_state=0))]),
+        "hashing signed + SGD hinge": Pipeline([
+            ("hashing", HashingVectorizer(n_features=2 ** 12)), ("clf", SGDClassifier(random_state=0))]),
+        "tfidf + sigmoid-calibrated LinearSVC": Pipeline([
+            ("tfidf", TfidfVectorizer()),
+            ("clf", CalibratedClassifierCV(LinearSVC(), method="sigmoid", cv=3, ensemble=False))]),
+        "tfidf + sigmoid-calibrated MultinomialNB": Pipeline([
+            ("tfidf", TfidfVectorizer()),
+            ("clf", CalibratedClassifierCV(MultinomialNB(), method="sigmoid", cv=3, ensemble=False))]),
+    }
+
+
+def check_trained(texts, labels, check_texts):
+    ok = True
+    for name, pipeline in _training_pipelines().items():
+        pipeline.fit(texts, labels)
+        with tempfile.TemporaryDirectory() as tmp:
+            export_artifact(pipeline, tmp)
+            artifact = load_artifact(tmp)
+            labels_out = np.array(artifact["manifest"]["labels"])
+            ours = predict_proba(artifact, check_texts)
+            same = bool((labels_out[ours.argmax(axis=1)] == pipeline.predict(check_texts)).all())
+            diff = float(np.abs(decision_scores(artifact, check_texts) - pipeline.decision_function(check_texts)).max()) \
+                if hasattr(pipeline, "decision_function") else 0.0
+            if hasattr(pipeline, "predict_proba"):
+                diff = max(diff, float(np.abs(ours - pipeline.predict_proba(check_texts)).max()))
+            del artifact
+        ok &= _report(name, same and diff < 1e-9, f"max difference {diff:.2e}, same predictions: {same}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the NumPy predictor against scikit-learn.")
+    parser.add_argument("--data", default="data/error_training_data.json")
+    parser.add_argument("--artifact", default=ARTIFACT_PATH)
+    args = parser.parse_args()
+
+    with open(args.data, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    texts = [item.get("error_message", "") for item in data]
+    labels = [item.get("category", "Unknown") for item in data]
+    check_texts = texts + EXTRA_TEXTS
+
+    warnings.simplefilter("ignore")
+    ok = check_artifact(args.artifact, check_texts)
+    ok &= check_trained(texts, labels, check_texts)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.ai_helper import BATCH_SIZE, iter_predict_error_categories, load_model
+
+# Bulk-classify error messages (one per line) with the trained model.
+# Example: python scripts/classify_errors.py errors.txt > labelled.jsonl
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify error messages in bulk.")
+    parser.add_argument("input", nargs="?", help="text file with one error message per line (default: stdin)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    # Keep stdout clean JSON lines; load messages go to stderr
+    with redirect_stdout(sys.stderr):
+        if load_model() is None:
+            sys.exit(1)
+
+    source = open(args.input, "r", encoding="utf-8") if args.input else sys.stdin
+    with source:
+        messages = (line.rstrip("\n") for line in source if line.strip())
+        # Tee the messages so each prediction can be printed next to its input
+        pending = deque()
+
+        def remember(lines):
+            for line in lines:
+                pending.append(line)
+                yield line
+
+        for prediction in iter_predict_error_categories(remember(messages), args.batch_size):
+            print(json.dumps({"error_message": pending.popleft(), **prediction}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,19 @@
+import json, os, sys
 
-import json, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.tasks import load_catalogue
 
 SRC = "data/coding_task.json"
 OUT = "data/coding_task_converted.json"
 
-with open(SRC, "r", encoding="utf-8") as f:
-    data = json.load(f)
+# The app tolerates a missing or broken task file; converting one must not
+# quietly write an empty catalogue
+if not os.path.exists(SRC):
+    sys.exit(f"⚠️ {SRC} not found")
+catalogue = load_catalogue(SRC)
+if catalogue["error"]:
+    sys.exit(f"⚠️ {SRC}: {catalogue['error']}")
+data = catalogue["tasks"]
 
 new = []
 for task in data:
@@ -19,4 +27,4 @@ for task in data:
 with open(OUT, "w", encoding="utf-8") as f:
     json.dump(new, f, indent=2)
 
-print("Wrote", OUT)
\ No newline at end of file
+print("Wrote", OUT)
@@ -0,0 +1,29 @@
+import argparse
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.model_artifact import ARTIFACT_PATH, export_artifact
+
+# Convert a pickled scikit-learn pipeline into the model artifact directory
+# the app loads. train_error_classifier.py writes the artifact itself; this is
+# for pipelines trained elsewhere or saved by older versions of the script.
+# Example: python scripts/export_model.py old_model.pkl
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a pickled pipeline as a model artifact.")
+    parser.add_argument("pickle", help="pickled TF-IDF/hashing vectorizer + linear classifier pipeline")
+    parser.add_argument("--out", default=ARTIFACT_PATH, help="artifact directory to write")
+    args = parser.parse_args()
+
+    with open(args.pickle, "rb") as f:
+        pipeline = pickle.load(f)
+    manifest = export_artifact(pipeline, args.out, source=os.path.basename(args.pickle))
+    print(f"✅ Exported {manifest['classifier']['type']} with {manifest['n_features']} features "
+          f"and labels {manifest['labels']} to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
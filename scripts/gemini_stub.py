@@ -0,0 +1,92 @@
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Gemini REST API, for checking cache hits and misses
+# without a key or network access. Every request is counted and logged.
+#   python scripts/gemini_stub.py --port 8765 --delay 1 --fail-first 2
+#   GEMINI_API_KEY=test GEMINI_API_BASE=http://127.0.0.1:8765/v1beta streamlit run main.py
+
+
+class GeminiStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive and chunked streaming, like the real API
+    delay = 0.0
+    fail_remaining = 0
+    stream_interval = 0.05
+    requests_served = 0
+
+    def _prompt(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        return body.get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+
+    def do_POST(self):
+        type(self).requests_served += 1
+        prompt = self._prompt()
+        print(f"[stub] request #{self.requests_served}: {self.path.split('?')[0]} ({len(prompt)} chars)")
+        time.sleep(self.delay)
+
+        if self.fail_remaining > 0:
+            # Exercise the client's retry/backoff path
+            type(self).fail_remaining -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        # Non-ASCII on purpose, so clients' decoding is exercised
+        text = f"Stub explanation for: {prompt[:80]} — here’s a fix 🛠️ café"
+        if ":streamGenerateContent" in self.path:
+            self._stream(text)
+            return
+
+        payload = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # Server-sent events, one word per event, like ?alt=sse on the real API
+    def _stream(self, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in text.split(" "):
+            event = {"candidates": [{"content": {"parts": [{"text": word + " "}]}}]}
+            # Raw UTF-8 like the real API, not \u escapes
+            frame = f"data: {json.dumps(event, ensure_ascii=False)}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(frame):X}\r\n".encode("ascii") + frame + b"\r\n")
+            self.wfile.flush()
+            time.sleep(self.stream_interval)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, delay=0.0, fail_first=0):
+    GeminiStubHandler.delay = delay
+    GeminiStubHandler.fail_remaining = fail_first
+    return ThreadingHTTPServer(("127.0.0.1", port), GeminiStubHandler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Gemini API stand-in.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds to wait before answering")
+    parser.add_argument("--fail-first", type=int, default=0, help="answer the first N requests with 503")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.delay, args.fail_first)
+    print(f"Gemini stub listening on http://127.0.0.1:{server.server_port}/v1beta")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
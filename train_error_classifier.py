@@ -1,79 +1,394 @@
+import argparse
+import hashlib
 import json
 import pickle
+import random
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from sklearn.feature_extraction.text import TfidfVectorizer
-# from sklearn.naive_bayes import MultinomialNB 
-from sklearn.svm import LinearSVC 
-from sklearn.pipeline import Pipeline 
-from sklearn.model_selection import train_test_split, GridSearchCV 
-from sklearn.metrics import classification_report, accuracy_score
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import Memory
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+# from sklearn.naive_bayes import MultinomialNB
+from sklearn.linear_model import SGDClassifier
+from sklearn.svm import LinearSVC
+from sklearn.pipeline import Pipeline
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV
+from sklearn.base import clone
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.metrics import classification_report, accuracy_score, log_loss
+
+from core.model_artifact import ARTIFACT_PATH, export_artifact
 
 DATA_PATH = Path("data/error_training_data.json")
-MODEL_PATH = Path("models/error_classifier.pkl")
+MODEL_PATH = Path(ARTIFACT_PATH)
+
+# Incremental mode keeps its classifier and how far it has read the labelled
+# error log here, so each run only trains on what is new.
+INCREMENTAL_STATE_PATH = Path("models/incremental_state.pkl")
+# Featurized corpora, keyed by the texts and vectorizer settings, so repeated
+# runs and parameter sweeps skip vectorizing.
+FEATURE_CACHE_DIR = Path("models/cache")
+# Fitted pipeline stages from the search; candidates that only change the
+# classifier reuse the vectorizer fitted for the same fold.
+PIPELINE_CACHE_DIR = FEATURE_CACHE_DIR / "pipeline"
+
+# Samples are assigned to the evaluation split by a hash of their text, so a
+# sample is held out on every run and is never trained on, including samples
+# that arrive later from the user logs. A third slice of the training data is
+# set aside when sweeping parameters in incremental mode.
+SPLIT_BUCKETS = 10
+TEST_BUCKETS = {0, 1}
+VALIDATION_BUCKETS = {2}
 
-# Load dataset safely 
-if not DATA_PATH.exists():
-    raise FileNotFoundError(f" Training data not found at {DATA_PATH}")
 
-with open(DATA_PATH, "r", encoding="utf-8") as f:
+# Wall time per training stage, printed by timing_report() at the end of a run.
+_timings = []
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
     try:
-        data = json.load(f)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"⚠️ Error decoding JSON from {DATA_PATH}: {e}")
-
-# Extract texts and labels, handling potential missing keys 
-texts = [item.get("error_message", "") for item in data]
-labels = [item.get("category", "Unknown") for item in data]
-
-# Sanity check the data
-if not texts or not labels or len(texts) != len(labels):
-    raise ValueError("⚠️ Training data seems empty, malformed, or texts/labels mismatch.")
-if len(set(labels)) < 2:
-    raise ValueError("⚠️ Training data requires at least two distinct classes (labels).")
-
-print(f"Loaded {len(texts)} samples.")
-
-# Pipeline for explicit naming of steps
-pipeline = Pipeline([
-    ('tfidf', TfidfVectorizer()),
-    ('clf', LinearSVC(dual="auto")) # Using LinearSVC, dual="auto" is often recommended
-])
-
-# Define parameter ranges to search. 
-parameters = {
-    'tfidf__ngram_range': [(1, 1), (1, 2)], 
-    'tfidf__max_df': [0.85, 0.95, 1.0],     
-    'tfidf__min_df': [1, 2],                
-    'clf__C': [0.1, 1, 10],                
-    
-}
-
-# Perform Grid Search with Cross-Validation 
-print("Starting GridSearchCV (this might take a while)...")
-grid_search = GridSearchCV(pipeline, parameters, cv=5, n_jobs=-1, verbose=1)
-grid_search.fit(texts, labels) 
-
-# Report Best Results
-print("\n--- Grid Search Results ---")
-print(f"✅ Best parameters found: {grid_search.best_params_}")
-print(f"✅ Best cross-validation accuracy score: {grid_search.best_score_:.3f}")
-
-# Evaluate Best Model on a Hold-Out Test Set
-print("\n--- Evaluating on Hold-Out Test Set ---")
-X_train, X_test, y_train, y_test = train_test_split(
-    texts, labels, test_size=0.2, random_state=42, stratify=labels 
-)
-
-best_model = grid_search.best_estimator_ 
-# best_model.fit(X_train, y_train)
-predictions = best_model.predict(X_test)
-final_accuracy = accuracy_score(y_test, predictions)
-print(f"Accuracy on hold-out test set: {final_accuracy:.3f}")
-print("\nClassification Report on hold-out test set:\n", classification_report(y_test, predictions, zero_division=0))
-
-# Best Trained Model Saved
-MODEL_PATH.parent.mkdir(parents=True, exist_ok=True)
-with open(MODEL_PATH, "wb") as f:
-    pickle.dump(best_model, f)
-
-print(f"\n✅ Best model saved successfully at: {MODEL_PATH.resolve()}")
\ No newline at end of file
+        yield
+    finally:
+        _timings.append((stage, time.perf_counter() - start))
+
+
+def timing_report():
+    if not _timings:
+        return
+    total = sum(seconds for _, seconds in _timings)
+    print("\n--- Timing Report ---")
+    for stage, seconds in _timings:
+        print(f"{stage:<32} {seconds:8.2f}s")
+    print(f"{'total':<32} {total:8.2f}s")
+
+
+def load_dataset(path=DATA_PATH):
+    # Load dataset safely
+    if not path.exists():
+        raise FileNotFoundError(f" Training data not found at {path}")
+
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"⚠️ Error decoding JSON from {path}: {e}")
+
+    # Extract texts and labels, handling potential missing keys
+    texts = [item.get("error_message", "") for item in data]
+    labels = [item.get("category", "Unknown") for item in data]
+
+    # Sanity check the data
+    if not texts or not labels or len(texts) != len(labels):
+        raise ValueError("⚠️ Training data seems empty, malformed, or texts/labels mismatch.")
+    if len(set(labels)) < 2:
+        raise ValueError("⚠️ Training data requires at least two distinct classes (labels).")
+
+    print(f"Loaded {len(texts)} samples.")
+    return texts, labels
+
+
+def split_bucket(text):
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) % SPLIT_BUCKETS
+
+
+# Returns (train_texts, train_labels, test_texts, test_labels).
+def split_dataset(texts, labels):
+    train, test = ([], []), ([], [])
+    for text, label in zip(texts, labels):
+        part = test if split_bucket(text) in TEST_BUCKETS else train
+        part[0].append(text)
+        part[1].append(label)
+    return train[0], train[1], test[0], test[1]
+
+
+def evaluate(model, texts, labels, title="hold-out test set"):
+    if not texts:
+        print(f"⚠️ No samples in the {title}; skipping evaluation.")
+        return None
+    predictions = model.predict(texts)
+    accuracy = accuracy_score(labels, predictions)
+    print(f"Accuracy on {title} ({len(texts)} samples): {accuracy:.3f}")
+    print(f"\nClassification Report on {title}:\n", classification_report(labels, predictions, zero_division=0))
+    return accuracy
+
+
+# How far the predicted probabilities can be trusted, for the manifest.
+def evaluate_confidence(model, texts, labels):
+    if not texts:
+        return {}
+    probabilities = model.predict_proba(texts)
+    confidence = probabilities.max(axis=1)
+    correct = model.classes_[probabilities.argmax(axis=1)] == np.asarray(labels)
+    metrics = {
+        "holdout_log_loss": float(log_loss(labels, probabilities, labels=model.classes_)),
+        "holdout_median_confidence": float(np.median(confidence)),
+        "holdout_mean_confidence_correct": float(confidence[correct].mean()) if correct.any() else None,
+        "holdout_mean_confidence_wrong": float(confidence[~correct].mean()) if (~correct).any() else None,
+    }
+    print(f"Log loss {metrics['holdout_log_loss']:.3f}, median confidence {metrics['holdout_median_confidence']:.2f}")
+    return metrics
+
+
+# Best Trained Model Saved, as the artifact the app loads (core/model_artifact.py)
+def save_model(model, metrics, source):
+    export_artifact(model, MODEL_PATH, metrics=metrics, source=source)
+    print(f"\n✅ Model saved successfully at: {MODEL_PATH.resolve()}")
+
+
+# Hyperparameter search over a TF-IDF + LinearSVC pipeline. Only the
+# training split is searched and fitted; the test split is scored once.
+# Successive halving scores every candidate on a small share of the data and
+# gives the best 1/factor of them more data each round, and the pipeline memory keeps
+# fitted TF-IDF stages so they are not refitted for every value of C.
+def run_search(args):
+    with timed("load data"):
+        texts, labels = load_dataset(args.data)
+        X_train, y_train, X_test, y_test = split_dataset(texts, labels)
+    print(f"Training on {len(X_train)} samples, holding out {len(X_test)}.")
+
+    memory = None if args.no_cache else Memory(PIPELINE_CACHE_DIR, verbose=0)
+    # Pipeline for explicit naming of steps
+    pipeline = Pipeline([
+        ('tfidf', TfidfVectorizer()),
+        ('clf', LinearSVC(dual="auto")) # Using LinearSVC, dual="auto" is often recommended
+    ], memory=memory)
+
+    # Define parameter ranges to search.
+    parameters = {
+        'tfidf__ngram_range': [(1, 1), (1, 2)],
+        'tfidf__max_df': [0.85, 0.95, 1.0],
+        'tfidf__min_df': [1, 2],
+        'clf__C': [0.1, 1, 10],
+
+    }
+
+    if args.search == "grid":
+        print("Starting GridSearchCV (this might take a while)...")
+        search = GridSearchCV(pipeline, parameters, cv=args.cv, n_jobs=-1, verbose=1, refit=False)
+    else:
+        print("Starting HalvingGridSearchCV...")
+        # Each round needs a few samples of every class in every fold
+        min_resources = min(len(X_train), args.cv * len(set(y_train)) * 2)
+        search = HalvingGridSearchCV(
+            pipeline, parameters, cv=args.cv, factor=args.factor, min_resources=min_resources,
+            n_jobs=-1, random_state=args.seed, verbose=1, refit=False,
+        )
+    with timed(f"{args.search} search"):
+        search.fit(X_train, y_train)
+
+    # Report Best Results
+    print("\n--- Search Results ---")
+    print(f"✅ Best parameters found: {search.best_params_}")
+    print(f"✅ Best cross-validation accuracy score: {search.best_score_:.3f}")
+    if args.search == "halving":
+        for i, (candidates, resources) in enumerate(zip(search.n_candidates_, search.n_resources_)):
+            print(f"  round {i}: {candidates} candidates on {resources} samples")
+    fit_times = search.cv_results_["mean_fit_time"]
+    print(f"  {len(fit_times)} candidate fits, mean {fit_times.mean():.3f}s per fold")
+
+    # The search doesn't refit (refit=False): the model that ships is fitted
+    # once here, stage by stage, and those are the timings reported.
+    # LinearSVC margins are not probabilities; the app reads the model's
+    # confidence to decide whether to trust it, so fit a Platt sigmoid per
+    # class on cross-validated margins. ensemble=False keeps one linear model
+    # (refit on the whole training split) that the artifact format can store.
+    chosen = clone(pipeline).set_params(memory=None, **search.best_params_)
+    vectorizer = chosen.named_steps["tfidf"]
+    with timed("final fit: tfidf"):
+        features = vectorizer.fit_transform(X_train)
+    with timed("final fit: calibrated clf"):
+        clf = CalibratedClassifierCV(chosen.named_steps["clf"], method="sigmoid", cv=args.cv, ensemble=False)
+        clf.fit(features, y_train)
+    best_model = Pipeline([("tfidf", vectorizer), ("clf", clf)])
+
+    # Evaluate Best Model on the Hold-Out Test Set
+    print("\n--- Evaluating on Hold-Out Test Set ---")
+    with timed("evaluate"):
+        accuracy = evaluate(best_model, X_test, y_test)
+        calibration = evaluate_confidence(best_model, X_test, y_test)
+    metrics = {
+        "holdout_accuracy": accuracy,
+        **calibration,
+        "cv_accuracy": float(search.best_score_),
+        "train_samples": len(X_train),
+        "test_samples": len(X_test),
+        "best_params": {k: list(v) if isinstance(v, tuple) else v for k, v in search.best_params_.items()},
+    }
+    with timed("save model"):
+        save_model(best_model, metrics, source=f"train_error_classifier.py --mode search --search {args.search}")
+
+
+def make_hashing_vectorizer(n_features):
+    # Stateless, so new samples never need the vocabulary refitted
+    return HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False, norm="l2")
+
+
+# Vectorize `texts`, reusing a cached copy from an earlier run when the
+# texts and vectorizer settings are unchanged.
+def featurize(texts, vectorizer, use_cache=True):
+    params = json.dumps(vectorizer.get_params(), sort_keys=True, default=str)
+    key = hashlib.sha256("\0".join([params, *texts]).encode("utf-8")).hexdigest()[:20]
+    path = FEATURE_CACHE_DIR / f"features-{key}.npz"
+    if use_cache and path.exists():
+        print(f"Reusing cached features from {path}")
+        return sp.load_npz(path)
+
+    features = vectorizer.transform(texts).tocsr()
+    if use_cache:
+        FEATURE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        sp.save_npz(path, features)
+    return features
+
+
+def _fit_epochs(clf, features, labels, classes, epochs, seed):
+    order = list(range(features.shape[0]))
+    rng = random.Random(seed)
+    for _ in range(epochs):
+        rng.shuffle(order)
+        clf.partial_fit(features[order], [labels[i] for i in order], classes=classes)
+    return clf
+
+
+def _new_sgd(alpha, seed):
+    return SGDClassifier(loss="log_loss", alpha=alpha, random_state=seed)
+
+
+# Fit a fresh SGD model on the training split, picking alpha on a validation
+# slice when more than one is given. Returns the incremental state.
+def _initial_fit(args, texts, labels, classes, vectorizer):
+    features = featurize(texts, vectorizer, use_cache=not args.no_cache)
+    alpha = args.alpha[0]
+    if len(args.alpha) > 1:
+        fit_rows = [i for i, t in enumerate(texts) if split_bucket(t) not in VALIDATION_BUCKETS]
+        val_rows = [i for i, t in enumerate(texts) if split_bucket(t) in VALIDATION_BUCKETS]
+        print(f"\n--- Sweeping alpha on {len(val_rows)} validation samples ---")
+        scores = {}
+        for candidate in args.alpha:
+            clf = _fit_epochs(
+                _new_sgd(candidate, args.seed), features[fit_rows], [labels[i] for i in fit_rows],
+                classes, args.epochs, args.seed,
+            )
+            scores[candidate] = accuracy_score([labels[i] for i in val_rows], clf.predict(features[val_rows])) if val_rows else 0.0
+            print(f"  alpha={candidate:g}: validation accuracy {scores[candidate]:.3f}")
+        alpha = max(args.alpha, key=lambda a: scores[a])
+        print(f"✅ Best alpha: {alpha:g}")
+
+    clf = _fit_epochs(_new_sgd(alpha, args.seed), features, labels, classes, args.epochs, args.seed)
+    return {
+        "model": Pipeline([("hashing", vectorizer), ("clf", clf)]),
+        "classes": classes,
+        "last_labelled_id": 0,
+        "extra_test": ([], []),
+        "trained_samples": len(texts),
+    }
+
+
+def _load_state():
+    if not INCREMENTAL_STATE_PATH.exists():
+        return None
+    with open(INCREMENTAL_STATE_PATH, "rb") as f:
+        return pickle.load(f)
+
+
+def _save_state(state):
+    INCREMENTAL_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = INCREMENTAL_STATE_PATH.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f)
+    tmp.replace(INCREMENTAL_STATE_PATH)
+
+
+# Warm-started training: HashingVectorizer + SGDClassifier updated with
+# partial_fit. The first run (or --reset) fits the training split of the
+# corpus; later runs only train on errors labelled in the user logs since the
+# previous run.
+def run_incremental(args):
+    from core.learning_log import load_labelled_errors
+
+    with timed("load data"):
+        texts, labels = load_dataset(args.data)
+        X_train, y_train, X_test, y_test = split_dataset(texts, labels)
+    vectorizer = make_hashing_vectorizer(args.n_features)
+
+    state = None if args.reset else _load_state()
+    if state is None:
+        # Every category seen so far must be declared up front for partial_fit
+        logged = load_labelled_errors()
+        classes = sorted(set(labels) | {row["category"] for row in logged})
+        print(f"Fitting a new incremental model on {len(X_train)} samples ({len(classes)} classes).")
+        with timed("initial fit"):
+            state = _initial_fit(args, X_train, y_train, classes, vectorizer)
+
+    new_rows = load_labelled_errors(after_id=state["last_labelled_id"])
+    new_train, new_test = ([], []), state["extra_test"]
+    skipped = set()
+    for row in new_rows:
+        if row["category"] not in state["classes"]:
+            skipped.add(row["category"])
+            continue
+        part = new_test if split_bucket(row["message"]) in TEST_BUCKETS else new_train
+        part[0].append(row["message"])
+        part[1].append(row["category"])
+    if skipped:
+        print(f"⚠️ Skipping new categories {sorted(skipped)}; run with --reset to add them.")
+
+    if new_train[0]:
+        print(f"Training on {len(new_train[0])} newly labelled errors from the user logs.")
+        clf = state["model"].named_steps["clf"]
+        with timed("partial fit on new errors"):
+            features = featurize(new_train[0], vectorizer, use_cache=False)
+            _fit_epochs(clf, features, new_train[1], state["classes"], args.epochs, args.seed)
+        state["trained_samples"] += len(new_train[0])
+    else:
+        print("No newly labelled errors to train on.")
+    if new_rows:
+        state["last_labelled_id"] = new_rows[-1]["id"]
+
+    print("\n--- Evaluating on Hold-Out Test Set ---")
+    with timed("evaluate"):
+        accuracy = evaluate(state["model"], X_test + new_test[0], y_test + new_test[1])
+    metrics = {
+        "holdout_accuracy": accuracy,
+        "train_samples": state["trained_samples"],
+        "test_samples": len(X_test) + len(new_test[0]),
+        "last_labelled_id": state["last_labelled_id"],
+    }
+    with timed("save model"):
+        _save_state(state)
+        save_model(state["model"], metrics, source="train_error_classifier.py --mode incremental")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the error classifier.")
+    parser.add_argument("--mode", choices=["search", "incremental"], default="search",
+                        help="search: full grid search over TF-IDF + LinearSVC; "
+                             "incremental: update a hashing + SGD model with new data")
+    parser.add_argument("--data", type=Path, default=DATA_PATH, help="labelled training corpus (JSON)")
+    parser.add_argument("--search", choices=["halving", "grid"], default="halving",
+                        help="successive halving, or the exhaustive grid (search mode)")
+    parser.add_argument("--cv", type=int, default=5, help="cross-validation folds (search mode)")
+    parser.add_argument("--factor", type=int, default=3, help="halving: keep 1/factor of candidates per round")
+    parser.add_argument("--alpha", type=float, nargs="+", default=[1e-4],
+                        help="SGD regularization; several values are swept on a validation slice")
+    parser.add_argument("--epochs", type=int, default=5, help="passes over each batch in incremental mode")
+    parser.add_argument("--n-features", type=int, default=2 ** 18, help="hashing vectorizer width")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="discard the incremental state and refit")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write cached features")
+    args = parser.parse_args()
+
+    if args.mode == "incremental":
+        run_incremental(args)
+    else:
+        run_search(args)
+    timing_report()
+
+
+if __name__ == "__main__":
+    main()